@@ -0,0 +1,75 @@
+"""
+Benchmark the time taken to send a command to the NETIOM card, opening
+a new connection for each command as `Drive` used to, and over the
+persistent connection of `HTTPTransport`. Then benchmark the requests
+and time taken by `Drive.set_speed` over a slew, writing every DAC bit
+as it used to, writing only the changed bits, and writing them in a
+single request.
+
+The card is emulated by a local `FakeNetiom`, so the times only show the
+cost of the connections on this machine; over the network to the
+telescope the saving from keeping the connection open is larger.
+
+    PYTHONPATH=. python benchmarks/bench_netiom.py
+"""
+
+from __future__ import print_function
+
+import time
+
+import numpy as np
+
+try:
+    from urllib.request import urlopen
+except ImportError:
+    from urllib import urlopen
+
+from pulsar_telescope import drive, netiom
+
+COMMANDS = 2000
+
+
+def latencies(send):
+    times = np.empty(COMMANDS)
+    for i in range(COMMANDS):
+        start = time.time()
+        send('A09' if i % 2 else 'B09')
+        times[i] = time.time() - start
+    return times*1e3
+
+
+def main():
+    with netiom.FakeNetiom() as card:
+        def reopen(command):
+            urlopen("{0}?{1}".format(card.url, command)).close()
+        transport = netiom.HTTPTransport(card.url)
+
+        print("{0:>12} {1:>10} {2:>10} {3:>10}".format("", "mean (ms)", "p50 (ms)", "p99 (ms)"))
+        for name, send in (("urlopen", reopen), ("keep-alive", transport.send)):
+            times = latencies(send)
+            print("{0:>12} {1:>10.3f} {2:>10.3f} {3:>10.3f}".format(
+                name, times.mean(), np.percentile(times, 50), np.percentile(times, 99)))
+        transport.close()
+
+        # The speeds of a slew which slows as it approaches its target
+        speeds = (np.linspace(60, 0, 500)/360)**0.25
+        print()
+        print("{0:>12} {1:>14} {2:>16}".format("set_speed", "requests/call", "time/call (ms)"))
+        for name, delta, multi in (("every bit", False, False), ("changed", True, False),
+                                   ("batched", True, True)):
+            dish = drive.Drive(simulate=1, url=card.url, multi_command=multi)
+            dish.switch_simulate(0)
+            card.requests = 0
+            start = time.time()
+            for speed in speeds:
+                if not delta:
+                    dish.dac_word = None
+                dish.set_speed(speed)
+            elapsed = time.time() - start
+            print("{0:>12} {1:>14.2f} {2:>16.3f}".format(
+                name, card.requests/float(len(speeds)), elapsed*1e3/len(speeds)))
+            dish.transport.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+"""
+Benchmark the trial-period search on 1, 2, 4 and 8 processes.
+
+Searches a night of simulated 1 kHz data for the Crab over a grid of
+trial frequencies and frequency derivatives.
+
+    PYTHONPATH=. python benchmarks/bench_search.py
+"""
+
+from __future__ import print_function
+
+import multiprocessing
+import time
+
+import numpy as np
+
+from pulsar_telescope import search
+
+SAMP_RATE = 1000.0
+HOURS = 8
+FREQUENCY = 29.946923
+
+
+def main():
+    rng = np.random.RandomState(1054)
+    times = np.arange(int(HOURS*3600*SAMP_RATE))/SAMP_RATE
+    data = rng.normal(size=len(times)).astype(np.float32)
+    frequencies = FREQUENCY + np.linspace(-1e-4, 1e-4, 401)
+    fdots = np.linspace(-8e-10, 0, 21)
+
+    print("{0} cores available".format(multiprocessing.cpu_count()))
+    print("{0:>8} {1:>10} {2:>8}".format("workers", "time (s)", "speedup"))
+    base = None
+    for workers in (1, 2, 4, 8):
+        start = time.time()
+        search.fold_search(data, times, frequencies, fdots, workers=workers)
+        elapsed = time.time() - start
+        base = base or elapsed
+        print("{0:>8} {1:>10.2f} {2:>8.2f}".format(workers, elapsed, base/elapsed))
+
+
+if __name__ == '__main__':
+    main()
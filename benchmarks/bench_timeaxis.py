@@ -0,0 +1,44 @@
+"""
+Benchmark the reconstruction of a capture's time axis across overruns.
+
+Compares building the per-sample time array by appending one segment
+at a time, as the TimeSeries constructor used to, with filling it from
+a TimeAxis, for an increasing number of overrun segments.
+
+    PYTHONPATH=. python benchmarks/bench_timeaxis.py
+"""
+
+from __future__ import print_function
+
+import timeit
+
+import numpy as np
+
+from pulsar_telescope.timeaxis import TimeAxis
+
+SAMPLES = 2000000
+SAMP_RATE = 1000.0
+
+
+def appended(firsts, starts):
+    times = np.array([])
+    lasts = np.append(firsts[1:], SAMPLES)
+    for first, last, start in zip(firsts, lasts, starts):
+        times = np.append(times, start + np.arange(last - first)/SAMP_RATE)
+    return times
+
+
+def main():
+    print("{0:>9} {1:>12} {2:>12}".format("segments", "append (s)", "TimeAxis (s)"))
+    for nseg in (1, 10, 100, 1000, 10000):
+        firsts = np.linspace(0, SAMPLES, nseg, endpoint=False).astype(np.int64)
+        starts = 1117000000.0 + firsts/SAMP_RATE + np.arange(nseg)*0.5
+        axis = TimeAxis(firsts, starts, SAMP_RATE, SAMPLES)
+        repeat = 1 if nseg > 1000 else 3
+        old = min(timeit.repeat(lambda: appended(firsts, starts), number=1, repeat=repeat))
+        new = min(timeit.repeat(axis.gps, number=1, repeat=3))
+        print("{0:>9} {1:>12.4f} {2:>12.4f}".format(nseg, old, new))
+
+
+if __name__ == '__main__':
+    main()
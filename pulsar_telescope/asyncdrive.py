@@ -0,0 +1,263 @@
+"""
+An asyncio interface to the telescope drive.
+
+The methods of `Drive` block until the controller has answered, so a
+slew alternates between reading the encoder and setting the speed, and
+each update of the speed waits for both round trips. `AsyncDrive` runs
+the same hardware operations concurrently as asyncio tasks: one polls
+the encoder, one writes the latest requested speed to the DAC, and the
+LabJack power line is switched without blocking the others. Each
+blocking call runs in a thread of its own channel and is given a
+deadline, after which it is treated as failed.
+
+A slew updates the requested speed from the latest encoder position on
+a fixed control period, however long a single request to the
+controller takes, and the event loop remains free to serve the status
+of the drive while it runs.
+"""
+
+import asyncio, json, logging
+from concurrent.futures import ThreadPoolExecutor
+
+from . import netiom
+
+
+class AsyncDrive(object):
+    """
+    Concurrent control of a `Drive`.
+
+    Parameters
+    ----------
+    drive : Drive
+       The drive to control.
+    period : float, optional
+       The control period of a slew, and the period of the encoder
+       polling, in seconds. Default is 0.1.
+    deadline : float, optional
+       The longest time to wait for a request to the controller or the
+       LabJack, in seconds. Default is 1.
+    encoder : transport, optional
+       The transport used to read the encoder, so that reads do not wait
+       behind commands. By default a second connection is opened to the
+       drive's netiom if it uses an `HTTPTransport`, and otherwise the
+       drive's transport is shared.
+    """
+
+    def __init__(self, drive, period=0.1, deadline=1.0, encoder=None):
+        self.drive = drive
+        self.period = period
+        self.deadline = deadline
+        if encoder is None:
+            transport = drive.transport
+            if isinstance(transport, netiom.HTTPTransport):
+                encoder = netiom.HTTPTransport(transport.url, transport.timeout,
+                                               transport.retries, transport.backoff)
+            else:
+                encoder = transport
+        self.encoder = encoder
+        self.logger = logging.getLogger('PT.AsyncDrive')
+        # One thread for each channel, so that a slow request on one
+        # channel does not hold up the others.
+        self._executors = dict((name, ThreadPoolExecutor(1)) for name in ('encoder', 'dac', 'power'))
+        self.position = None
+        self.position_time = None
+        self.speed = None
+        self.target_speed = None
+        self.enabled = False
+        self.missed = dict((name, 0) for name in self._executors)
+        self._tasks = []
+        self._speed_changed = None
+        self._position_changed = None
+
+    async def call(self, channel, function, *args):
+        """
+        Run a blocking function in the thread of a channel, and return
+        its result.
+
+        Raises
+        ------
+        asyncio.TimeoutError
+           If the function does not return before the deadline. The
+           function is left to finish in its thread.
+        """
+        loop = asyncio.get_event_loop()
+        future = loop.run_in_executor(self._executors[channel], function, *args)
+        try:
+            return await asyncio.wait_for(future, self.deadline)
+        except asyncio.TimeoutError:
+            self.missed[channel] += 1
+            self.logger.warning("The {0} missed its deadline.".format(channel))
+            raise
+
+    async def start(self):
+        """
+        Start polling the encoder and writing speeds.
+        """
+        self._speed_changed = asyncio.Event()
+        self._position_changed = asyncio.Event()
+        self._tasks = [asyncio.ensure_future(self._poll()),
+                       asyncio.ensure_future(self._write())]
+        return self
+
+    async def stop(self):
+        """
+        Stop the tasks, and close the encoder's connection.
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._speed_changed = self._position_changed = None
+        if self.encoder is not self.drive.transport:
+            self.encoder.close()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *args):
+        await self.stop()
+
+    def _read(self):
+        return self.drive.update_position(self.encoder.lines('digitalinputs.cgi')[0])
+
+    async def _poll(self):
+        loop = asyncio.get_event_loop()
+        tick = loop.time()
+        while True:
+            try:
+                self.position = await self.call('encoder', self._read)
+                self.position_time = loop.time()
+                self._position_changed.set()
+            except (asyncio.TimeoutError, IOError, IndexError) as error:
+                self.logger.error("Could not read the encoder: {0}".format(error))
+            tick = max(tick + self.period, loop.time())
+            await asyncio.sleep(tick - loop.time())
+
+    async def _write(self):
+        # Only the latest requested speed is written, so requests made
+        # while a write is in progress replace each other.
+        while True:
+            await self._speed_changed.wait()
+            self._speed_changed.clear()
+            speed = self.target_speed
+            try:
+                if await self.call('dac', self.drive.set_speed, speed):
+                    raise IOError("The controller did not take the speed.")
+                self.speed = speed
+            except (asyncio.TimeoutError, IOError) as error:
+                self.logger.error("Could not set the speed: {0}".format(error))
+                # The DAC may hold part of the word
+                self.drive.dac_word = None
+
+    def _check_started(self):
+        if self._speed_changed is None:
+            raise RuntimeError("The AsyncDrive has not been started.")
+
+    def set_speed(self, v):
+        """
+        Request a speed, which is written to the DAC as soon as any
+        write in progress has finished.
+        """
+        self._check_started()
+        self.target_speed = v
+        self._speed_changed.set()
+
+    async def read_position(self):
+        """
+        Wait for the next reading of the encoder, and return it.
+        """
+        self._check_started()
+        self._position_changed.clear()
+        await self._position_changed.wait()
+        return self.position
+
+    async def enable(self):
+        """
+        Switch on the power to the drive, wait for the controller to
+        start, and enable the servo output.
+        """
+        await self.call('power', self.drive.power, 1)
+        await asyncio.sleep(self.drive.warmup)
+        await self.call('dac', self.drive.sendstr, ['A09'])
+        self.enabled = True
+
+    async def disable(self):
+        """
+        Disable the servo output, and switch off the power to the drive.
+        """
+        self.enabled = False
+        try:
+            await self.call('dac', self.drive.sendstr, ['B09'])
+        finally:
+            await self.call('power', self.drive.power, 0)
+
+    async def slew(self, hh, tolerance=0.2, timeout=None):
+        """
+        Slew the telescope to an hour angle.
+
+        Parameters
+        ----------
+        hh : float
+           The hour angle, in degrees.
+        tolerance : float, optional
+           The distance from the hour angle at which to stop, in
+           degrees. Default is 0.2.
+        timeout : float, optional
+           The longest time the slew may take, in seconds. By default
+           there is no limit.
+
+        Returns
+        -------
+        float
+           The position the slew finished at.
+        """
+        await self.enable()
+        try:
+            await asyncio.wait_for(self._slew(hh, tolerance), timeout)
+        finally:
+            await self.disable()
+        return self.position
+
+    async def _slew(self, hh, tolerance):
+        loop = asyncio.get_event_loop()
+        if self.position is None:
+            await self.read_position()
+        tick = loop.time()
+        while True:
+            diff, speed = self.drive.control(hh, self.position)
+            if diff <= tolerance:
+                return
+            self.set_speed(speed)
+            tick += self.period
+            delay = tick - loop.time()
+            if delay < 0:
+                # The loop has fallen behind, so skip the missed periods
+                tick = loop.time()
+                delay = 0
+            await asyncio.sleep(delay)
+
+    def status(self):
+        """
+        Return the state of the drive as a dictionary.
+        """
+        loop = asyncio.get_event_loop()
+        age = None if self.position_time is None else loop.time() - self.position_time
+        return {'position': self.position, 'position_age': age, 'speed': self.speed,
+                'target_speed': self.target_speed, 'enabled': self.enabled,
+                'missed': dict(self.missed)}
+
+    async def serve_status(self, host='127.0.0.1', port=0):
+        """
+        Serve the status of the drive as a line of JSON to each client
+        which connects.
+
+        Returns
+        -------
+        asyncio.AbstractServer
+           The server, which can be closed when it is no longer needed.
+        """
+        async def handle(reader, writer):
+            writer.write((json.dumps(self.status()) + '\n').encode('ascii'))
+            await writer.drain()
+            writer.close()
+        return await asyncio.start_server(handle, host, port)
@@ -0,0 +1,198 @@
+"""
+Correction of sample times to the solar system barycentre.
+
+The pulse arrival times seen at Acre Road are shifted by the light travel
+time across the Earth's orbit and by its rotation, and these change over
+the course of a long track. The delays are smooth on timescales of
+minutes, so rather than calculating them for every sample they are
+calculated on a coarse grid of times and interpolated onto the samples
+in one call. The corrected times can be passed straight to the folding
+functions in place of the observed times.
+"""
+
+import numpy as np
+from astropy import units as u
+from astropy.coordinates import EarthLocation, SkyCoord, get_body_barycentric_posvel
+from astropy.time import Time
+
+# The speed of light, in metres per second
+C = 299792458.0
+
+# The location of the telescope at Acre Road observatory
+ACRE_ROAD = EarthLocation.from_geodetic(lon="-4d18m25.93s", lat="55d54m8.29s", height=50*u.m)
+
+
+def direction(coords):
+    """
+    Return the unit vector towards a source in the ICRS frame.
+
+    Parameters
+    ----------
+    coords : SkyCoord or ephem.Equatorial
+       The position of the source. Objects from ephem, which have `ra`
+       and `dec` in radians, are taken to be at the J2000 epoch.
+    """
+    if isinstance(coords, SkyCoord):
+        return coords.icrs.cartesian.xyz.value
+    ra, dec = float(coords.ra), float(coords.dec)
+    return np.array([np.cos(dec)*np.cos(ra), np.cos(dec)*np.sin(ra), np.sin(dec)])
+
+
+def observer_posvel(gps, location=ACRE_ROAD):
+    """
+    Calculate the position and velocity of an observer relative to the
+    solar system barycentre.
+
+    Parameters
+    ----------
+    gps : float or array-like
+       The GPS times.
+    location : EarthLocation, optional
+       The location of the observer. If None, the centre of the Earth
+       is used. Default is Acre Road.
+
+    Returns
+    -------
+    position : numpy.ndarray
+       The position at each time, in metres, with the x, y and z
+       components along the first axis.
+    velocity : numpy.ndarray
+       The velocity at each time, in metres per second.
+    """
+    time = Time(gps, format='gps', scale='tai')
+    position, velocity = get_body_barycentric_posvel('earth', time)
+    position = position.xyz.to_value(u.m)
+    velocity = velocity.xyz.to_value(u.m/u.s)
+    if location is not None:
+        site_position, site_velocity = location.get_gcrs_posvel(time)
+        position = position + site_position.xyz.to_value(u.m)
+        velocity = velocity + site_velocity.xyz.to_value(u.m/u.s)
+    return position, velocity
+
+
+def delays(gps, coords, location=ACRE_ROAD):
+    """
+    Calculate the delay to add to observed times to give the time at
+    which each wavefront passed the barycentre, including the change of
+    time scale from TT to TDB.
+
+    Parameters
+    ----------
+    gps : float or array-like
+       The GPS times.
+    coords : SkyCoord or ephem.Equatorial
+       The position of the source.
+    location : EarthLocation, optional
+       The location of the observer. If None, the centre of the Earth
+       is used. Default is Acre Road.
+
+    Returns
+    -------
+    numpy.ndarray
+       The delay at each time, in seconds.
+    """
+    position, _ = observer_posvel(gps, location)
+    roemer = np.dot(direction(coords), position)/C
+    time = Time(gps, format='gps', scale='tai', location=location)
+    tdb, tt = time.tdb, time.tt
+    einstein = ((tdb.jd1 - tt.jd1) + (tdb.jd2 - tt.jd2))*86400.0
+    return roemer + einstein
+
+
+def radial_velocity(gps, coords, location=ACRE_ROAD):
+    """
+    Calculate the velocity of an observer towards a source.
+
+    Parameters
+    ----------
+    gps : float or array-like
+       The GPS times.
+    coords : SkyCoord or ephem.Equatorial
+       The position of the source.
+    location : EarthLocation, optional
+       The location of the observer. If None, the centre of the Earth
+       is used. Default is Acre Road.
+
+    Returns
+    -------
+    velocity : numpy.ndarray
+       The velocity towards the source, in metres per second.
+    speed : numpy.ndarray
+       The speed of the observer relative to the barycentre, in metres
+       per second.
+    """
+    _, velocity = observer_posvel(gps, location)
+    return np.dot(direction(coords), velocity), np.sqrt((velocity**2).sum(axis=0))
+
+
+class BarycentricCorrection(object):
+    """
+    Corrects observed times to the solar system barycentre by
+    interpolating delays calculated on a coarse grid.
+
+    Parameters
+    ----------
+    coords : SkyCoord or ephem.Equatorial
+       The position of the source.
+    location : EarthLocation, optional
+       The location of the observer. If None, the centre of the Earth
+       is used. Default is Acre Road.
+    step : float, optional
+       The spacing of the grid, in seconds. The delays are interpolated
+       linearly, and with the default of 60 seconds the error from
+       interpolation is a few tens of nanoseconds.
+    """
+
+    def __init__(self, coords, location=ACRE_ROAD, step=60.0):
+        self.coords = coords
+        self.location = location
+        self.step = float(step)
+        self._grid = np.zeros(0)
+        self._delays = np.zeros(0)
+
+    def grid(self, start, end):
+        """
+        Return the grid times covering `start` to `end` and the delay
+        at each of them. Grid points are aligned to multiples of the
+        step, so the grids of successive chunks of an observation are
+        shared, and only new points are calculated.
+        """
+        first = np.floor(start/self.step)*self.step
+        last = np.ceil(end/self.step)*self.step
+        if not len(self._grid) or first < self._grid[0] or last > self._grid[-1]:
+            if len(self._grid):
+                first, last = min(first, self._grid[0]), max(last, self._grid[-1])
+            times = np.arange(first, last + self.step/2, self.step)
+            if len(times) < 2:
+                times = np.array([first, first + self.step])
+            known = np.isin(times, self._grid)
+            values = np.empty(len(times))
+            values[known] = self._delays[np.searchsorted(self._grid, times[known])]
+            if not known.all():
+                values[~known] = delays(times[~known], self.coords, self.location)
+            self._grid, self._delays = times, values
+        return self._grid, self._delays
+
+    def delay(self, gps):
+        """
+        Return the delay at each of the GPS times `gps`, in seconds.
+        """
+        gps = np.asarray(gps, dtype=np.float64)
+        grid, values = self.grid(np.min(gps), np.max(gps))
+        # Interpolate relative to the grid to keep the precision of the times
+        return np.interp(gps - grid[0], grid - grid[0], values)
+
+    def correct(self, gps, out=None):
+        """
+        Return the barycentric time of each of the GPS times `gps`.
+
+        Parameters
+        ----------
+        gps : array-like
+           The observed GPS times.
+        out : numpy.ndarray, optional
+           The array to write the corrected times into. This may be
+           `gps` itself.
+        """
+        delay = self.delay(gps)
+        return np.add(gps, delay, out=out)
@@ -0,0 +1,215 @@
+"""
+An on-disk cache of parsed captures.
+
+Parsing the metadata of a capture and building its time axis is done
+every time a TimeSeries is made from it. The cache stores the result of
+that work as an `.npz` file in a cache directory, so that later loads of
+the same capture can skip it. The samples themselves are not copied into
+the cache, as the capture is already raw float32 data which can be read
+or memory-mapped directly.
+
+Entries are keyed by the size, modification time and a hash of the
+capture and its header file, so a capture which is rewritten is parsed
+again. Entries can be removed explicitly with `invalidate` or `clear`,
+and the cache is kept under a size limit by removing the entries which
+were least recently used.
+"""
+
+import glob, hashlib, logging, os, tempfile
+
+import numpy as np
+
+# Increase this when the layout of the cached entries changes.
+CACHE_VERSION = 2
+
+# The number of bytes read from each end of a capture for its hash.
+HASH_BYTES = 1 << 20
+
+
+class CaptureCache(object):
+    """
+    A directory of cached capture metadata.
+
+    Parameters
+    ----------
+    directory : str, optional
+       The directory to store the cache in. By default a
+       `.pulsar_cache` directory is made beside each capture.
+    max_bytes : int, optional
+       The largest size the cache directory may grow to. When an entry
+       is stored which takes the cache over this size, the least
+       recently used entries are removed. By default the cache is not
+       limited.
+    """
+
+    suffix = '.npz'
+
+    def __init__(self, directory=None, max_bytes=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.logger = logging.getLogger('PT.Cache')
+
+    def _directory(self, filepath):
+        if self.directory is not None:
+            return self.directory
+        return os.path.join(os.path.dirname(os.path.abspath(filepath)), '.pulsar_cache')
+
+    def _prefix(self, filepath):
+        name = os.path.abspath(filepath).encode('utf-8')
+        return hashlib.sha1(name).hexdigest()[:16]
+
+    def key(self, filepath, **params):
+        """
+        Return the key for a capture, which changes whenever the capture,
+        its header file, or the parameters used to parse it change.
+        """
+        digest = hashlib.sha1()
+        digest.update(repr((CACHE_VERSION, sorted(params.items()))).encode('utf-8'))
+        stat = os.stat(filepath)
+        digest.update(repr((stat.st_size, stat.st_mtime)).encode('utf-8'))
+        with open(filepath, 'rb') as fd:
+            digest.update(fd.read(HASH_BYTES))
+            if stat.st_size > HASH_BYTES:
+                fd.seek(max(stat.st_size - HASH_BYTES, HASH_BYTES))
+                digest.update(fd.read(HASH_BYTES))
+        head_file = filepath+".hdr"
+        if os.path.isfile(head_file):
+            with open(head_file, 'rb') as fd:
+                digest.update(fd.read())
+        return digest.hexdigest()
+
+    def path(self, filepath, **params):
+        """
+        Return the location of the cache entry for a capture.
+        """
+        name = "{0}-{1}{2}".format(self._prefix(filepath), self.key(filepath, **params), self.suffix)
+        return os.path.join(self._directory(filepath), name)
+
+    def load(self, filepath, **params):
+        """
+        Load the cache entry for a capture.
+
+        Parameters
+        ----------
+        filepath : str
+           The location of the capture.
+
+        Other keyword arguments are the parameters the capture was
+        parsed with, and form part of the key.
+
+        Returns
+        -------
+        dict or None
+           The arrays stored for the capture, or None if there is no
+           valid entry.
+        """
+        path = self.path(filepath, **params)
+        if not os.path.isfile(path):
+            return None
+        try:
+            # The cache may be writeable by others, so nothing in it
+            # is unpickled.
+            with np.load(path, allow_pickle=False) as entry:
+                arrays = dict((name, entry[name]) for name in entry.files)
+        except (IOError, ValueError, EOFError):
+            self.logger.warning("Removing unreadable cache entry {0}".format(path))
+            self._remove(path)
+            return None
+        # Mark the entry as recently used, for eviction.
+        os.utime(path, None)
+        self.logger.debug("Loaded {0} from the cache".format(filepath))
+        return arrays
+
+    def store(self, filepath, arrays, **params):
+        """
+        Store the arrays for a capture in the cache, replacing any
+        existing entries for it.
+
+        Parameters
+        ----------
+        filepath : str
+           The location of the capture.
+        arrays : dict
+           The arrays to store. Arrays of objects cannot be loaded
+           again, so values such as tags should be stored as strings.
+
+        Other keyword arguments are the parameters the capture was
+        parsed with, and form part of the key.
+        """
+        path = self.path(filepath, **params)
+        directory = os.path.dirname(path)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self.invalidate(filepath)
+        # Write to a temporary file first so that other processes never
+        # see a partly written entry.
+        fd, temp = tempfile.mkstemp(suffix='.tmp', dir=directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, **arrays)
+            # The cache may be shared with other users of the disk.
+            os.chmod(temp, 0o644)
+            os.rename(temp, path)
+        except Exception:
+            self._remove(temp)
+            raise
+        self.logger.debug("Stored {0} in the cache".format(filepath))
+        if self.max_bytes is not None:
+            self.evict(self.max_bytes, directory)
+        return path
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _entries(self, directory):
+        if directory is None:
+            raise ValueError("No cache directory was given.")
+        return glob.glob(os.path.join(directory, '*'+self.suffix))
+
+    def invalidate(self, filepath):
+        """
+        Remove every cache entry for a capture.
+        """
+        directory = self._directory(filepath)
+        for path in glob.glob(os.path.join(directory, self._prefix(filepath)+'-*'+self.suffix)):
+            self._remove(path)
+
+    def clear(self, directory=None):
+        """
+        Remove every entry from a cache directory. By default this is
+        the directory given to the cache.
+        """
+        for path in self._entries(directory or self.directory):
+            self._remove(path)
+
+    def size(self, directory=None):
+        """
+        Return the total size in bytes of the entries in a cache
+        directory. By default this is the directory given to the cache.
+        """
+        return sum(os.path.getsize(path) for path in self._entries(directory or self.directory))
+
+    def evict(self, max_bytes, directory=None):
+        """
+        Remove the least recently used entries from a cache directory
+        until it is no larger than `max_bytes`.
+
+        Returns
+        -------
+        list
+           The entries which were removed.
+        """
+        entries = sorted((os.path.getmtime(path), os.path.getsize(path), path)
+                         for path in self._entries(directory or self.directory))
+        total = sum(size for _, size, _ in entries)
+        removed = []
+        for _, size, path in entries:
+            if total <= max_bytes:
+                break
+            self._remove(path)
+            removed.append(path)
+            total -= size
+        return removed
@@ -4,28 +4,22 @@ Data functions for the pulsar telescope at Acre Road.
 
 from pylightcurve import Lightcurve
 
-import ephem, logging, os
+import ephem, json, logging, os
 import numpy as np
 import matplotlib.pyplot as pl
 from matplotlib import dates
 import scipy
 import datetime 
-import scipy.signal
-
-from collections import deque,Counter
-from bisect import insort, bisect_left
-from itertools import islice
 import scipy.stats
 from astropy.time import Time
-#import astropysics
-#import astropysics.coords
+from .timeaxis import TimeAxis
+from . import metadata
+from .cache import CaptureCache
+from . import barycentre, filters, folding, search
 
-from copy import copy, deepcopy
+from copy import copy
 
-import pmt
-from gnuradio.blocks import parse_file_metadata
 import pandas as pd
-from functools import partial
 import os.path
 
 # Details of Acre Road observatory
@@ -37,7 +31,11 @@ class TimeSeries(Lightcurve):
 
     coords = ephem.Equatorial('03:32:59.368', '+54:34:43.57', epoch='2000')
 
-    def __init__(self, filepath, smoothing=3, window='hanning', sample=1, start=385000, title="Pulsar observations"):
+    _raw = None
+    _data = None
+    axis = None
+
+    def __init__(self, filepath, smoothing=3, window='hanning', sample=1, start=385000, title="Pulsar observations", mmap=False, cache=None):
         """Acre Road Telescope Pulsar Time Series
         -----------------------------------------
         
@@ -45,13 +43,53 @@ class TimeSeries(Lightcurve):
         astronomy time series produced by the GNU Radio toolkit, to
         conduct pre-processing, and to fold the resulting data.
 
+        Parameters
+        ----------
+        filepath : str
+           The location of the GNU Radio capture file. Metadata is read
+           from the `.hdr` file alongside it, if one exists.
+        sample : float, optional
+           The sample rate to use if the metadata does not provide one.
+        start : float, optional
+           The GPS start time to use if the metadata timestamp is invalid.
+        mmap : bool, optional
+           Map the capture read-only into memory instead of reading it,
+           and only build the DataFrame and time index when they are
+           first used. By default this is False.
+        cache : CaptureCache or bool, optional
+           A cache to restore the parsed metadata and time axis from,
+           and to store them in after they are parsed. If True, a cache
+           is kept beside the capture. By default no cache is used.
         """
-        data = scipy.fromfile(open(filepath), dtype=scipy.float32)
+        if mmap:
+            data = np.memmap(filepath, dtype=np.float32, mode='r')
+        else:
+            data = np.fromfile(filepath, dtype=np.float32)
 
         self.default="total power"
 
         self.data_len = len(data)
         
+        if cache is True:
+            cache = CaptureCache()
+        if cache:
+            meta = self._load_cached(cache, filepath, sample, start)
+        else:
+            meta = self._read_metadata(filepath, sample, start)
+
+        self._raw = data
+        self._meta = meta
+        if not mmap:
+            self._materialise()
+        
+        self.smoothing = smoothing
+        self.window = window
+        self.title = title
+
+    def _read_metadata(self, filepath, sample, start):
+        """
+        Parse the metadata of a capture, and build its time axis.
+        """
         # Load the meta data, and detect any overruns
         meta, overs = self.parse_metadata(filepath)
 
@@ -77,87 +115,208 @@ class TimeSeries(Lightcurve):
                                             
         self.start = gpstime
         self.start_t = Time(self.start, format='gps')    
-            
+
+        # The time axis is stored per overrun segment, and sample times
+        # are only calculated when they are asked for.
+        firsts = [0] + list(overs['new_seg'])
+        starts = [gpstime]
         if len(overs) > 0:
-            first, first_t = np.float64(0), np.float64(0)
-            times = np.array([])
-            for over in overs:
-                new, new_t = over['new_seg'], over['new_time']
-                seg_len = new - first
-                segment = np.linspace(first_t, first_t + new/np.float64(self.samp_rate), seg_len)
-                times = np.append(times, segment)
-                first, first_t = new, Time(new_t, format='unix').gps - self.start
-            seg_len = len(data) - first
-            segment = np.linspace(first_t, first_t + len(data)/np.float64(self.samp_rate), seg_len)
-            times = np.append(times, segment)
-        else:
-            times = np.linspace(0,len(data)/np.float64(samp_rate), len(data))+self.start
+            starts += list(Time(overs['new_time'], format='unix').gps)
+        self.axis = TimeAxis(firsts, starts, samp_rate, self.data_len)
+        return meta
 
-        self.times = times
-        times = Time(times, format='gps', scale='tai')
-        dframe = pd.DataFrame({'total power':data}, index=times.value)
-        self.import_data(dframe, meta, cts=times)
+    def _load_cached(self, cache, filepath, sample, start):
+        """
+        Restore the metadata and time axis of a capture from the cache,
+        parsing them and adding them to the cache if they are not there.
+        """
+        entry = cache.load(filepath, sample=sample, start=start)
+        if entry is None:
+            meta = self._read_metadata(filepath, sample, start)
+            cache.store(filepath, {'headers':self.headers, 'tags':metadata.tags_to_json(self.tags),
+                                   'overs':self.overs,
+                                   'firsts':self.axis.firsts, 'starts':self.axis.starts,
+                                   'samp_rate':self.samp_rate, 'meta':json.dumps(meta)},
+                        sample=sample, start=start)
+            return meta
+        self.headers, self.overs = entry['headers'], entry['overs']
+        self.tags = metadata.tags_from_json(str(entry['tags']))
+        self.samp_rate = entry['samp_rate'].item()
+        self.axis = TimeAxis(entry['firsts'], entry['starts'], self.samp_rate, self.data_len)
+        self.start = self.axis.start
+        self.start_t = Time(self.start, format='gps')
+        return json.loads(str(entry['meta']))
 
+    @property
+    def data(self):
+        """
+        The DataFrame of the time series, built on first access if the
+        capture was memory-mapped.
+        """
+        if self._data is None and self._raw is not None:
+            self._materialise()
+        return self._data
 
-        
-        self.time = times                   
-        self.smoothing = smoothing
-        self.window = window
-        self.title = title
+    @data.setter
+    def data(self, value):
+        self._data = value
+
+    @property
+    def times(self):
+        """
+        The GPS time of each sample, reconstructed across any overruns.
+        This is calculated from the time axis on every access.
+        """
+        return self.axis.gps()
+
+    @property
+    def time(self):
+        """
+        The sample times as an astropy `Time` object. This is calculated
+        from the time axis on every access.
+        """
+        return self.axis.to_time()
+
+    @property
+    def gaps(self):
+        """
+        The overrun gaps in the capture, with the first sample after
+        each gap, its GPS time, and the number of seconds dropped.
+        """
+        return self.axis.gaps
+
+    def time_index(self):
+        """
+        Return a copy of the DataFrame indexed by the GPS time of each
+        sample, rather than by sample number.
+        """
+        return self.data.set_index(pd.Index(self.times, name='gps'))
+
+    def _materialise(self):
+        """
+        Copy the raw samples into a DataFrame indexed by sample number,
+        and release the raw samples.
+        """
+        dframe = pd.DataFrame({self.default:self._raw})
+        self.import_data(dframe, self._meta)
+        # The DataFrame holds its own copy of the samples
+        self._raw = None
+
+    def _samples(self):
+        # The samples as an array, without building the DataFrame
+        if self._data is None:
+            return self._raw
+        return self._data[self.default].values
+
+    def segment(self, first, last):
+        """
+        Return a new TimeSeries containing samples `first` to `last` of
+        this one. The samples are a view of this object's samples, and
+        the metadata is shared.
+
+        Parameters
+        ----------
+        first : int
+           The index of the first sample in the segment.
+        last : int
+           The index one past the last sample in the segment.
+        """
+        new = copy(self)
+        new._raw = self._samples()[first:last]
+        new.data_len = len(new._raw)
+        new._data = None
+        new.axis = self.axis.slice(first, last)
+        new.start = new.axis.start
+        new.start_t = Time(new.start, format='gps')
+        inside = (self.overs['new_seg'] > first) & (self.overs['new_seg'] < last)
+        new.overs = self.overs[inside]
+        new.overs['new_seg'] -= first
+        inside = (self.tags['offset'] >= first) & (self.tags['offset'] < last)
+        new.tags = self.tags[inside]
+        new.tags['offset'] -= first
+        return new
+
+    @classmethod
+    def iter_chunks(cls, filepath, chunk_seconds=60, **kwargs):
+        """
+        Iterate over a capture in blocks of fixed duration, so that
+        captures larger than the available memory can be processed in a
+        single pass.
+
+        Parameters
+        ----------
+        filepath : str
+           The location of the GNU Radio capture file.
+        chunk_seconds : float, optional
+           The duration of each block, in seconds. Default is 60.
+
+        Other keyword arguments are passed to the TimeSeries constructor.
+
+        Yields
+        ------
+        TimeSeries
+           Consecutive segments of the capture, each carrying its own
+           GPS start time and the sample rate from the metadata.
+        """
+        kwargs['mmap'] = True
+        whole = cls(filepath, **kwargs)
+        chunk = max(int(chunk_seconds*whole.samp_rate), 1)
+        for first in range(0, whole.data_len, chunk):
+            yield whole.segment(first, first+chunk)
 
     @property
     def clc(self):
-        return np.array(self.data[self.default])
+        return self._clc()[0]
+
+    def _clc(self):
+        # The samples, and whether they are a private copy which may be
+        # modified. The raw samples may be a view of another series.
+        if self._data is None and self._raw is not None:
+            # Avoid building the DataFrame just to read the samples back.
+            return self._raw, False
+        return np.array(self.data[self.default]), True
         
     def parse_metadata(self, filepath):
-        head_file = filepath+".hdr"
-        hlen = parse_file_metadata.HEADER_LENGTH
+        """
+        Read the GNU Radio metadata which accompanies a capture, and
+        detect any overruns. The headers and extra tags are kept as
+        structured arrays in `headers` and `tags`.
 
-        headers = []
-        extra_tags = []
+        Parameters
+        ----------
+        filepath : str
+           The location of the capture file. The metadata is read from
+           the `.hdr` file alongside it.
+
+        Returns
+        -------
+        meta : dict
+           The first header, keyed by column.
+        overs : numpy.ndarray
+           The first sample and unix time of each segment which
+           follows an overrun.
+        """
+        head_file = filepath+".hdr"
 
-        overs = []
+        self.headers = np.zeros(0, dtype=metadata.HEADER_DTYPE)
+        self.tags = np.zeros(0, dtype=metadata.TAG_DTYPE)
 
         if not os.path.isfile(head_file):
-            return {'total power':{}}, []
-
-        with open(head_file,'rb') as fd:
-            for h_str in iter(partial(fd.read, hlen), ''):
-                h_pmt = pmt.deserialize_str(h_str)
-                h_parsed=parse_file_metadata.parse_header(h_pmt,False)
-                headers.append(h_parsed)
-                if(h_parsed["extra_len"] > 0):
-            
-                    extra_str = fd.read(h_parsed["extra_len"])
-                    if(len(extra_str) == 0):
-                        break
-                    extra = pmt.deserialize_str(extra_str)
-                    e_parsed = parse_file_metadata.parse_extra_dict(extra, h_parsed, False)
-                    extra_tags.append(e_parsed)
-
-        # Load the extra data into the tagging system for the LightCurve.
-        tags = pd.DataFrame({'total power':[{} for _ in xrange(self.data_len)]})
-        nums_done = 0 
-        segment_start_time = headers[0]['rx_time']
-        segments = 1
-        for i  in xrange(len(extra_tags)):
-            j = int(nums_done + extra_tags[i]['nitems'])
-            if not extra_tags[i]['rx_time'] == segment_start_time:
-
-                should = segment_start_time + j/extra_tags[i]['rx_rate']
-
-                miss_sec = extra_tags[i]['rx_time']-should
-
-                overs.append({'new_seg':j, 'new_time':extra_tags[i]['rx_time']})
-
-                segment_start_time = extra_tags[i]['rx_time']
-                segments += 1
-            j = int(nums_done + extra_tags[i]['nitems'])
-            tags['total power'][j] = extra_tags[i]
-            nums_done += extra_tags[i]['nitems']
-        new = self.import_tags(extra_tags, 'total power')
-            
-        return {'total power': headers[0]}, overs
+            return {'total power':{}}, metadata.find_overruns(self.headers)
+
+        self.headers, self.tags = metadata.read_headers(head_file)
+        if len(self.headers) == 0:
+            return {'total power':{}}, metadata.find_overruns(self.headers)
+
+        first = self.headers[0]
+        header = {}
+        for name in self.headers.dtype.names[1:]:
+            value = first[name].item()
+            if not (isinstance(value, float) and np.isnan(value)):
+                header[name] = value
+        header['has_extra'] = header['extra_len'] > 0
+
+        return {'total power': header}, metadata.find_overruns(self.headers)
 
 
     def remove_outlier(self, lower=0, upper=1000, **kwargs):
@@ -170,76 +329,97 @@ class TimeSeries(Lightcurve):
            The lower value cutoff. Default is 0.
         upper : float
            The upper value cutoff. Default is 1000.
+        sigma : float, optional
+           Also replace data which lie more than `sigma` standard
+           deviations from the median of their window, with the standard
+           deviation estimated from the median absolute deviation. By
+           default this is not done.
+        window : float, optional
+           The length of the windows for `sigma`, in seconds. Each
+           sample is judged against a window within a quarter of its
+           length of being centred on it. Default is 1.
+        column : str, optional
+           The column to filter. By default this is the default column.
         inplace : bool, optional
            Replaces the data in the object with the filtered data. By default this is
-           False.
+           False. Otherwise a new object is returned, which shares the
+           metadata and time axis of this one, and only the filtered
+           column is copied.
         """
-        new_object = deepcopy(self)
-        data = new_object.data
+        column = kwargs.get("column", self.default)
+        data = self.data
 
-        if "column" in kwargs:
-            column = kwargs["column"]
-            dataw = data[column].values
+        dataw = data[column].values
+        if kwargs.get("inplace", False):
+            new_object = self
+            if not dataw.flags.writeable:
+                dataw = dataw.copy()
         else:
-            dataw = data[self.default].values
-        
-        dataw[np.logical_or(dataw>upper, dataw<lower)] = np.nan
-        #dataw[dataw<lower] = np.nan
-        dataw = dataw - self._dcoffsets[self.default]
-        
-        if "column" in kwargs:
-            column = kwargs['column']
-            data[column]= dataw
-        else:
-            new_object.clc = dataw
+            new_object = copy(self)
+            new_object.data = data.copy(deep=False)
+            dataw = dataw.copy()
 
-        
-        if "inplace" in kwargs:
-            self.clc = dataw
-            self.data = data
-            return self
-        else:
-            return new_object
+        outliers = np.logical_or(dataw>upper, dataw<lower)
+        if kwargs.get("sigma") is not None:
+            window = int(kwargs.get("window", 1)*self.samp_rate)
+            outliers |= filters.mad_outliers(dataw, window, kwargs["sigma"])
+        dataw[outliers] = np.nan
+        dataw -= self._dcoffsets[self.default]
 
-    def homogen(self):
-        data = self.data
-        data_h = np.zeros([data.size])
+        new_object.data[column] = dataw
+        return new_object
 
-        # Let's reshape the array in preparation for homogenising
-        sample = self.sample
-        hour_s = int(3600*sample)
-        #noise = [42,15,7,3,9,9,11,6,9,14,16,21,30]
-        pad_size = np.ceil(float(data.size)/hour_s)*hour_s - data.size
-        b_padded = np.append(data, np.zeros(pad_size)*np.nan)
-        data_s = b_padded.reshape(-1,hour_s)   # The reshaped data
-        #print data_s.shape
-        for i in np.arange(data_s.shape[0]):
-            #print i, scipy.stats.nanstd(data_s[i,:])
-            data_s[i,:] = data_s[i,:]/(float(scipy.stats.nanstd(data_s[i,:])**2))
-        
-        self.data_h = np.delete(data_s.flatten(), np.arange(-pad_size,-1))
-
-    def relativeVelocity(self,jdn):
-        coords = self.coords
-        coords = ephem.Ecliptic(coords)
-        # Calculate the relative velocity of the Earth compared to an object at ecliptic 
-        # coordinates coords on julian day number jdn
-        cart_position = [ np.cos(coords.lat) * np.cos(coords.lon),
-                          np.cos(coords.lat) * np.sin(coords.lon),
-                          np.sin(coords.lat) ]
-        s = astropysics.coords.earth_pos_vel(jdn, barycentric=False, kms=True)[1]*1000
-        v = np.dot(np.array(s), cart_position)    # velocity relative to crab in m/s
-        return [v, np.linalg.norm(s)]
+    def homogen(self, block=3600):
+        """
+        Divide the data in each block of `block` seconds by its variance,
+        to even out changes in the noise level over an observation. The
+        result is stored in `data_h`.
+
+        Parameters
+        ----------
+        block : float, optional
+           The duration of each block, in seconds. Default is 3600.
+        """
+        data, copied = self._clc()
+        block_s = int(block*self.samp_rate)
+        # A copy of the samples can be normalised in place
+        self.data_h = filters.normalise_blocks(data, block_s, out=data if copied else None)
+        return self.data_h
+
+    def baseline(self, window=10, percentile=50):
+        """
+        Subtract a running percentile from the data, to remove slow
+        drifts in the baseline such as those from the receiver gain.
+        The result is stored in `data_b`.
+
+        Parameters
+        ----------
+        window : float, optional
+           The duration of the window centred on each sample, in
+           seconds. Default is 10.
+        percentile : float, optional
+           The percentile of the window to subtract. Default is 50,
+           the running median.
+        """
+        data, copied = self._clc()
+        window_s = max(int(window*self.samp_rate), 1)
+        self.baseline_level = filters.running_percentile(data, window_s, percentile)
+        # A copy of the samples can be subtracted from in place
+        self.data_b = np.subtract(data, self.baseline_level, out=data if copied else None)
+        return self.data_b
+
+    def relativeVelocity(self, jdn):
+        """
+        Calculate the velocity of Acre Road towards the source on julian
+        day number `jdn`, and its speed relative to the barycentre, both
+        in metres per second.
+        """
+        gps = Time(jdn, format='jd', scale='utc').gps
+        return barycentre.radial_velocity(gps, self.coords)
 
     def relativeVelocityEQ(self, jdn):
-        coords = self.coords
-        # Calculate the relative velocity of the Earth compared to an object at equatorial 
-        # coordinates coords on julian day number jdn
-        cart_position = [ np.cos(coords.dec) * np.cos(coords.ra),
-                          np.cos(coords.dec) * np.sin(coords.ra),
-                          np.sin(coords.dec) ]
-        s = astropysics.coords.earth_pos_vel(jdn, barycentric=False, kms=True)[1]*1000
-        v = np.dot(np.array(s), cart_position)    # velocity relative to crab in m/s
+        # The velocity does not depend on the frame the coordinates are in.
+        return self.relativeVelocity(jdn)
 
     def doppler(self, v):
         # Calculate the redshifting caused by a velocity of v
@@ -250,13 +430,31 @@ class TimeSeries(Lightcurve):
     def jdntodublin(self,jdn):
         # Convert the standard Julian Day Number to a Dublin Modified JDN
         return jdn - 2415020
-        
-    def dopplerCorrect(self):
-        f = np.fft.fft(self.data)
-        d = Time(self.time[0], format='gps')
-        v = self.relativeVelocity(d.jd)
-        f =  f/self.doppler(v)
-        return np.fft.ifft(f)
+
+    def barycentric_times(self, correction=None):
+        """
+        Return the times of the samples at the solar system barycentre,
+        as GPS times.
+
+        Parameters
+        ----------
+        correction : BarycentricCorrection, optional
+           The correction to apply. By default the delays towards
+           `coords` from Acre Road are used.
+        """
+        if correction is None:
+            correction = barycentre.BarycentricCorrection(self.coords)
+        times = self.times
+        return correction.correct(times, out=times)
+
+    def dopplerCorrect(self, correction=None):
+        """
+        Correct for the Doppler shift from the motion of the Earth by
+        moving the sample times to the barycentre, rather than by
+        scaling the spectrum of the data. The corrected times are
+        returned, for folding with `fold`.
+        """
+        return self.barycentric_times(correction)
 
     def get_f(self, time, ephemeris):
         """
@@ -264,11 +462,8 @@ class TimeSeries(Lightcurve):
         and the fractional difference between steps for a 
         pulsar given a time and an ephemeris file.
         """
-        ephem = np.genfromtxt(ephemeris)
-        hour = 3600
-        f = np.interp(time, ephem[:,0], ephem[:,1])
-        fdot = (np.interp(time, ephem[:,0], ephem[:,1]) - np.interp(time-hour, ephem[:,0], ephem[:,1]))/hour
-        return time, f, fdot
+        predictor = folding.load_predictor(ephemeris)
+        return time, predictor.frequency(time), predictor.fdot(time)
 
     def save(self, filepath, **kwargs):
         """
@@ -293,50 +488,49 @@ class TimeSeries(Lightcurve):
         return self
         
         
-    def fold(self, ephemeris):
-        """
-        Folds a lightcurve at a given frequency.
+    def fold(self, ephemeris, rfi=None, correction=None):
         """
-        self.homogen()
-        data = self.data_h
+        Folds a lightcurve using the pulse phase predicted by an ephemeris.
 
-        data = scipy.signal.medfilt(data, 5)
+        Parameters
+        ----------
+        ephemeris : str or PhasePredictor
+           The ephemeris file, with columns of GPS time and pulse
+           frequency, or a predictor already made from one.
+        rfi : RFIExcision, optional
+           The stage used to flag interference, which is left out of
+           the fold. By default samples more than 10 robust standard
+           deviations from the median of the previous second are
+           flagged. The flags are stored in `rfi_mask`.
+        correction : BarycentricCorrection, optional
+           A correction applied to the sample times before they are
+           folded, for an ephemeris which predicts the pulse frequency
+           at the barycentre. By default the times are not corrected.
+        """
+        if isinstance(ephemeris, folding.PhasePredictor):
+            predictor = ephemeris
+        else:
+            predictor = folding.load_predictor(ephemeris)
+        data = self.homogen()
         
-        sample = self.sample
-        time = self.time
+        sample = self.samp_rate
+        if correction is None:
+            time = self.times
+        else:
+            time = self.barycentric_times(correction)
 
         # Remove the DC Offset from the data
-        data = data - np.median(data)
-        data = self.correct_outliers(value=10)
-         
-        # Correct the frequencies for doppler shift
-        # data = self.dopplerCorrect(data)
+        data = data - np.nanmedian(data)
+        if rfi is None:
+            rfi = filters.RFIExcision(int(self.samp_rate), sigma=10)
+        data, self.rfi_mask = rfi.filter(data)
 
-        # The folding period must be the inverse of the frequency
-        # but we want the period in terms of bins, not of seconds
-        # so need to multiply by the number of samples per second
-        period = 1.0 / frequency
-        period_s = int(np.floor(sample*period))
-        
-        # We now have the period, so need to work out how many periods
-        # exist in the lightcurve
-        number_p = int(np.floor(len(data)/period_s))
-        
-        phase   = frequency * (time-time[0])
-
-        # Make an array for the stacked data
-        self.stack = np.zeros((period_s, number_p+1))
-        self.stackcount = np.zeros((period_s, number_p+1))
-        for i in np.arange(len(phase)):
-            # Calculate which period this is in
-            phase_b  = int(np.round( (phase[i] % 1) *(1/frequency)*self.sample) )
-            period = int(np.floor(phase_b / period_s))
-            phasey  = int(phase_b % period_s)
-
-            self.stack[phasey, period] += data[i]
-            if data[i]!=0:
-                self.stackcount[phasey, period] += 1
-            #print period,phase
+        # The phase bins are sized for the frequency at the start
+        phase = predictor.phase(time)
+        frequency = predictor.frequency(time[0])
+
+        # Stack the data, with one row per phase bin
+        self.stack, self.stackcount = folding.fold(data, phase, frequency, sample, mask=self.rfi_mask)
         
         return self.stack, self.stackcount
         
@@ -383,66 +577,56 @@ class TimeSeries(Lightcurve):
         # Need to recalculate the time axis
         self.phase = np.linspace(0, period, np.shape(folded)[0])
 
-    def find_freq_fold(self, frequency):
+    def find_freq_fold(self, frequency, width=None, ntrials=201, fdots=(0.0,), nbins=32, nsub=64, workers=1):
         """
         Finds the frequency by folding the lightcurve. An initial guess is required to speed this process.
-        """
-        #self.homogen()
-        
-        data = self.data #/scipy.stats.nanstd(self.data)**2
-        sample = self.sample
-        time = self.time
-
-        # Remove the DC Offset from the data
-        data = data - np.median(data)
-
-        # The folding period must be the inverse of the frequency
-        # but we want the period in terms of bins, not of seconds
-        # so need to multiply by the number of samples per second
-        period = 1.0 / frequency
-        period_s = int(np.floor(sample*period))
-
-        # We now have the period, so need to work out how many periods
-        # exist in the lightcurve
-        number_p = int(np.floor(len(data)/period_s))
-        
-        folded = np.zeros(np.floor(period_s))
-        folds  = np.zeros(np.floor(period_s))
 
-        # Let's reshape the array in preparation for folding
-        pad_size = np.ceil(float(data.size)/period_s)*period_s - data.size
-        b_padded = np.append(data, np.ones(pad_size)*np.nan)
-        data_s = b_padded.reshape(-1,period_s)   # The reshaped (thus stacked) data
-
-        means = data_s.mean(axis=0)
-        maxi  = np.nanmax(means)
-
-        # Try folding over a range of different periods close to
-        # the guess frequency
-        newperiod = period_s
-        periods = np.arange(period_s-40, period_s+40)
-        for period in periods:
-            pad_size = np.ceil(float(data.size)/period_s)*period_s - data.size
-            b_padded = np.append(data, np.ones(pad_size)*np.nan)
-            data_s = b_padded.reshape(-1,period_s)   # The reshaped (thus stacked) data
+        The lightcurve is folded once into sub-integrations at the
+        guessed frequency, and each trial is made by shifting and
+        summing their profiles, so the cost of each trial does not
+        depend on the length of the lightcurve.
 
-            means = data_s.mean(axis=0)
-            if np.nanmax(means)>maxi:
-                newperiod = period
-                maxi = np.nanmax(means)
-
-        print period_s, ",", period
-        # We also need to 'normalise' the data, so that it represents a set
-        # of means rather than just a total.
-
-        counted = np.ones(data_s.shape)
-        counted[np.isnan(data_s)] = 0
-        
-        self.data_s = data_s
-        self.fold_counter = counted
+        Parameters
+        ----------
+        frequency : float
+           The guessed pulse frequency at the start of the lightcurve, in Hz.
+        width : float, optional
+           The largest difference from the guess to try, in Hz. By
+           default this is 20 Fourier bins, 20 divided by the duration.
+        ntrials : int, optional
+           The number of trial frequencies. Default is 201.
+        fdots : array-like, optional
+           The trial frequency derivatives, in Hz per second. By
+           default only zero is tried.
+        nbins : int, optional
+           The number of phase bins. Default is 32.
+        nsub : int, optional
+           The number of sub-integrations. Default is 64.
+        workers : int, optional
+           The number of processes to divide the search between.
+           Default is 1.
+
+        Returns
+        -------
+        tuple
+           The frequency, frequency derivative and chi-squared of the
+           best trial. The chi-squared of every trial is stored in
+           `periodogram`, with the trials in `trial_frequencies` and
+           `trial_fdots`.
+        """
+        data = np.asarray(self.clc, dtype=np.float64)
+        time = self.axis.relative()
 
-        # Need to recalculate the time axis
-        self.phase = np.linspace(0, period, np.shape(folded)[0])
+        # Remove the DC Offset from the data
+        data = data - np.nanmedian(data)
+
+        if width is None:
+            width = 20.0/self.axis.duration
+        self.trial_frequencies = frequency + np.linspace(-width, width, ntrials)
+        self.trial_fdots = np.atleast_1d(fdots)
+        self.periodogram, best = search.fold_search(data, time, self.trial_frequencies,
+                                                    self.trial_fdots, nbins, nsub, workers)
+        return best
 
     # def smooth(self):
     #     """smooth the data using a window with requested size.
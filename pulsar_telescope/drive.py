@@ -15,7 +15,9 @@ This sub-module contains the following classes:
 
 
 """
-import urllib, ephem, time, math, logging, sys, os
+import ephem, time, math, logging, sys
+
+from . import encoder, netiom, pointing, positionlog, tracking
 
 
 # Details of Acre Road observatory
@@ -35,6 +37,10 @@ class Drive():
     visible = 0
     url = ""
     position = [0,0]
+    # The hour angle of the last good reading of the encoder, in degrees
+    pos_degree = 0
+    # The last word written to the DAC, or None if it is not known
+    dac_word = None
 
     def __init__(self,
                  debug=0,
@@ -42,7 +48,10 @@ class Drive():
                  logfile=None,
                  url='http://192.168.0.6/',
                  observatory=Acre_Road,
-                 hhoffset=0
+                 hhoffset=0,
+                 transport=None,
+                 multi_command=False,
+                 log_size=86400
              ):
 
         # Physical properties of the drive
@@ -55,15 +64,25 @@ class Drive():
         # Configuration information
         # this should probably be moved to its own file!
         self.url = url
+        # Commands are sent over a persistent connection to the netiom,
+        # which can be replaced, e.g. for tests.
+        if transport is None:
+            transport = netiom.HTTPTransport(url)
+        self.transport = transport
+        # Send each list of commands in a single request, if the netiom
+        # firmware accepts several commands at once.
+        self.multi_command = multi_command
+        # The resolution of the shaft encoder
+        self.encoder_bits = encoder.BITS
+        # Every reading of the encoder is kept in a ring buffer
+        self.log = positionlog.PositionLog(log_size)
+        # The time the controller takes to accept commands after power on
+        self.warmup = 10
         self.east_stop = -110 # mechanically is -117.0
         self.west_stop = 110  # mechanically is 112
-        # Load in the gray codes
-        grayfile = os.path.join(os.path.dirname(__file__), 'graycode.txt')
-        graycodefile = open(grayfile, 'r')
-        self.grayindex = graycodefile.readlines()
-        graycodefile.close()
         if simulate == 0 :
             import u3
+            self.u3 = u3
             # Contol of the drive's power supply is done by labjack
             self.d = u3.U3()
             self.d.configIO(FIOAnalog=15) # set the first four to analogue rest digital
@@ -76,8 +95,10 @@ class Drive():
         Send the string command s to the contoller.  stringlist is a list of commands
         so could be something like ['T00'] or ['A01','A02','A09'].
 
-        
+        If multi_command is set the list is sent in one request.
         """
+        if self.multi_command and len(stringlist) > 1:
+            stringlist = [netiom.COMMAND_SEPARATOR.join(stringlist)]
         for s in stringlist:
             # Form the command url
             command = "{0}?{1}".format(self.url,s)
@@ -90,8 +111,7 @@ class Drive():
                 return 0
             
             try:
-                f = urllib.urlopen(command)
-                f.close()
+                self.transport.send(s)
             except IOError:
                 self.logger.error("I/O error opening web page to send command to controller")
                 return 1
@@ -108,6 +128,8 @@ class Drive():
             self.simulate=0
         else:
             self.simulate=1
+        # The word held by the DAC is not known
+        self.dac_word = None
         #
                     
                 
@@ -139,13 +161,24 @@ class Drive():
         driving if a non-zero speed has been set (see set_speed)
         """
         if self.simulate: return 1
-        self.d.getFeedback(u3.BitStateWrite(4,1))
-        self.logger.info("Driver power enabled.")
+        self.power(1)
         # Wait for the server to be able to take commands.
-        time.sleep(10)
+        time.sleep(self.warmup)
         self.logger.info("Drive activated")
         return self.sendstr(['A09']) #set pin 9 high
 
+    def power(self, state):
+        """
+        Switch the drive's power supply on (state=1) or off (state=0), using
+        the labjack's FIO4 line.
+        """
+        if self.simulate: return 1
+        self.d.getFeedback(self.u3.BitStateWrite(4, int(bool(state))))
+        # The DAC pins are not known to hold their word over a power cycle
+        self.dac_word = None
+        self.logger.info("Driver power {0}.".format("enabled" if state else "disabled"))
+        return 0
+
         
     def disable(self):
         """
@@ -155,7 +188,7 @@ class Drive():
         """
         if self.simulate: return 1
         self.sendstr(['B09']) #set pin 9 low
-        self.d.getFeedback(u3.BitStateWrite(4,0))
+        self.power(0)
         self.logger.info("Drive deactivated")
         return 0
         
@@ -176,25 +209,43 @@ class Drive():
             
         
         speed = int((1.0-v)/2.0*255) # put in the range 0-255
+        vlist = self.dac_commands(speed)
+        if not vlist:
+            self.logger.debug("The speed is already {0}".format(speed))
+            return 0
+        # disable DAC inputs (pin 10 is connected to WR on the DAC. When this input
+        # is low, data is read.  When high the analogue voltage is fixed.)
+        # The DAC bits are set and then enabled/disabled in the same batch,
+        # so that the inputs are open for as short a time as possible.
+        if self.sendstr(['B10'] + vlist + ['A10','B10']):
+            # Some of the bits may not have been set
+            self.dac_word = None
+            return 1
+        # Nothing reaches the DAC in simulation mode
+        self.dac_word = None if self.simulate else speed
+        self.logger.info("The speed has been set to {0}".format(speed))
+        return 0
+
+    def dac_commands(self, word):
+        """
+        Returns the commands which set the DAC data pins (1-8) to the 8-bit
+        word, leaving out the pins which already hold their value.
+        """
         vlist = []
         for i in range(7,-1,-1):
-            if speed & 2**i:
+            if self.dac_word is not None and not (word ^ self.dac_word) & 2**i:
+                continue
+            if word & 2**i:
                 vlist.append('B0'+str(i+1))
             else:
                 vlist.append('A0'+str(i+1))
-        # disable DAC inputs (pin 10 is connected to WR on the DAC. When this input
-        # is low, data is read.  When high the analogue voltage is fixed.)
-        self.sendstr(['B10'])
-        self.sendstr(vlist)
-        self.sendstr(['A10','B10']) # enable/disable DAC inputs
-        self.logger.info("The speed has been set to {0}".format(speed))
-        return 0
+        return vlist
 
     def read_position(self):
         """
         The Netiom card serves files uploaded to it using the serial interface.
         If the filename extension is ".cgi", then %xx strings are replaced with
-        values.  The encoder uses gray codes, indexed by graycode.txt
+        values.  The encoder uses gray codes, decoded by the encoder module
         """
 
         command ="{0}digitalinputs.cgi".format(self.url)
@@ -206,23 +257,24 @@ class Drive():
             return 0
 
         try:
-            g = urllib.urlopen(command)
-            status_str = g.readline()
-            g.close()
-        except IOError:
+            status_str = self.transport.lines('digitalinputs.cgi')[0]
+        except (IOError, IndexError):
+            # Nothing is logged, so the position log only holds readings
             self.logger.error("I/O error reading the encoder.")
-            status_str = '0000000000000'
-        # The netiom reports the lowest bit (bit 1) first, so we have to
-        # reverse the string
-        s2 = ''
-        for i in range(0,13): s2 += status_str[12-i]
-        # now turn it into a graycode base 10 integer
-        gray = int(s2, base=2)
-        # ... and find the content of this element in grayindex (removing the
-        # trailing ".0\n".  Also, convert to degrees
-        position = self.grayindex[gray][:-3]
-        pos_degree = int(float(position))*360.0/8192.0
-        pos_degree -= self.hhoffset
+            return self.pos_degree
+        return self.update_position(status_str)
+
+    def update_position(self, status_str):
+        """
+        Decode the encoder position from a line of digitalinputs.cgi, and
+        store it as the current position.
+        """
+        # The netiom reports the lowest bit (bit 1) first; the gray code is
+        # decoded to a position, then converted to degrees
+        timestamp = time.time()
+        code = encoder.gray(status_str, self.encoder_bits)
+        degrees = encoder.table(self.encoder_bits)[code]*360.0/2**self.encoder_bits
+        pos_degree = degrees - self.hhoffset
         if pos_degree >180.0:
             pos_degree -= 360.0
 
@@ -232,38 +284,54 @@ class Drive():
         ra = self.observatory.sidereal_time() + hh
         self.position = [ephem.hours(ra), ephem.degrees(0)]
         self.pos_degree = pos_degree
+        self.log.append(timestamp, code, degrees, pos_degree)
         return pos_degree
 
+    def sample(self, n, interval=0):
+        """
+        Read the encoder n times, interval seconds apart, and return the
+        hour angles read, from the position log.
+        """
+        start = self.log.total
+        for i in range(n):
+            if i and interval:
+                time.sleep(interval)
+            self.read_position()
+        return self.log.hour_angles(self.log.total - start)
+
     def motor(self):
         """
         Reports on whether the motor is running.
         """
 
-        command = "{0}digitaloutputs.cgi".format(url)
+        command = "{0}digitaloutputs.cgi".format(self.url)
         self.logger.debug(command)
         
         if self.simulate:
             self.logger.warning("The module cannot report on the motor in simulation mode.")
             return 0
         try:
-            g = urllib.urlopen(command)
-            status_str = g.readline()
-            status_str = g.readline()
-            g.close()
-        except IOError:
+            status_str = self.transport.lines('digitaloutputs.cgi')[1]
+        except (IOError, IndexError):
             self.logger.error('I/O error reading digitalinputs.cgi to find motor status')
             status_str = '0000000000'
         if status_str[0]=='1':
             status = 'on'
         else:
             status='off'
-            return status
+        return status
 
     def diff(self, hh):
         """
         Calculate the difference between the current position and the given hour angle
         """
-        pos = self.read_position()
+        return self.control(hh, self.read_position())
+
+    def control(self, hh, pos):
+        """
+        Calculate the difference between a position and the given hour angle,
+        and the speed to drive at to close it.
+        """
         diff = hh - pos
         if abs(diff)>0.0001:
             sign = diff/abs(diff)
@@ -286,19 +354,15 @@ class Drive():
         while diff>0.2:
             self.set_speed(speed)
             diff,speed = self.diff(hh)
-            self.disable()
+        self.disable()
 
     def slew_ra(self, ra):
         """
         Slews the telescope to the requested RA.
         """
 
-        ra = ephem.hours(ra)
-        hh = ((self.observatory.sidereal_time() - ra )/math.pi * 180.0)
-        if hh > 180.0:
-            hh = hh-360.0
-        if hh < -180.0:
-            hh = hh+360.0
+        now = ephem.now()
+        hh = float(self.pointing(ra, now).hour_angle(now))
         self.enable()
         diff,speed = self.diff(hh)
         #if diff>0.2: self.enable()
@@ -320,38 +384,53 @@ class Drive():
         """
         return self.position
 
+    def pointing(self, source, date=None):
+        """
+        Returns the pointing table of a source, or of a fixed RA, for the
+        night containing date (by default now), against the drive stops.
+        """
+        if date is None:
+            date = ephem.now()
+        return pointing.table_for(source, self.observatory, date, self.east_stop, self.west_stop)
+
     def visibility(self, ra):
         """
         Returns a 1 if the hour angle is in the visibility of the telescope.
         """
-        self.observatory.date = ephem.now()
-        ra = ephem.hours(ra)
-        hh = ((self.observatory.sidereal_time() - ra )/math.pi * 180.0)
-        if hh > 180.0:
-            hh = hh-360.0
-        if hh < -180.0:
-            hh = hh+360.0
-        if self.east_stop < hh < self.west_stop:
+        now = ephem.now()
+        if self.pointing(ra, now).visible(now):
             return 1
         else:
             return 0
 
 
 class Track():
-    def __init__(drive, observatory, source):
+    def __init__(self, drive, observatory, source):
 
         # Observatory
+        self.drive = drive
         self.observatory = observatory
         self.source = source
         
-    def hour_angle(self):
-        observatory.date = ephem.now()
-        self.source.compute(observatory)
-        hh = (observatory.sidereal_time() - self.source.ra)/math.pi*180.0
-        return hh
-
-    def track(self,pausetime=600, driveahead=True):
-        if east_stop > self.hour_angle > west_stop:
-            drive.park()
-            logging.info("The source has moved out of the observable area.")
+    def hour_angle(self, date=None):
+        if date is None:
+            date = ephem.now()
+        table = pointing.table_for(self.source, self.observatory, date,
+                                   self.drive.east_stop, self.drive.west_stop)
+        return float(table.hour_angle(date))
+
+    def track(self, duration=600, rate=1.0, **kwargs):
+        """
+        Track the source for duration seconds, or until it leaves the drive
+        stops, running the control loop rate times a second. Other keyword
+        arguments are passed to tracking.TrackingController, which is
+        returned with the timings of the loop. The telescope is parked
+        if the source leaves the drive stops.
+        """
+        controller = tracking.TrackingController(self.drive, self.source, rate=rate,
+                                                 observatory=self.observatory, **kwargs)
+        controller.run(duration=duration)
+        if controller.left_stops:
+            self.drive.park()
+        return controller
         
\ No newline at end of file
@@ -0,0 +1,58 @@
+"""
+Decoding of the telescope's shaft encoder.
+
+The encoder reports the position of the telescope as a 13-bit Gray
+code, which the NETIOM card serves as a line of 0s and 1s on
+`digitalinputs.cgi`, lowest bit first. The position for each code is
+calculated once per process into a compact table of unsigned integers,
+so that decoding a status line is a single conversion and a lookup.
+Encoders of other resolutions are decoded by giving their number of
+bits.
+"""
+
+from array import array
+
+import numpy as np
+
+from . import graycode
+
+# The number of bits of the encoder, and the number of positions
+BITS = 13
+POSITIONS = 1 << BITS
+
+_tables = {}
+
+
+def table(bits=BITS):
+    """
+    Return the table of encoder positions, indexed by Gray code, as an
+    `array`. The table is made the first time it is needed.
+    """
+    if bits not in _tables:
+        positions = graycode.decode_table(bits)
+        _tables[bits] = array('H' if bits <= 16 else 'L', positions.tolist())
+    return _tables[bits]
+
+
+def gray(status, bits=BITS):
+    """
+    Return the Gray code in a NETIOM status line, which reports the
+    lowest bit first.
+    """
+    return int(status[bits-1::-1], 2)
+
+
+def decode(status, bits=BITS):
+    """
+    Return the encoder position, from 0 to 2**bits - 1, in a NETIOM
+    status line.
+    """
+    return table(bits)[gray(status, bits)]
+
+
+def decode_many(codes, bits=BITS):
+    """
+    Return the encoder positions of an array of Gray codes.
+    """
+    positions = table(bits)
+    return np.frombuffer(positions, dtype=np.dtype(positions.typecode))[np.asarray(codes)]
@@ -0,0 +1,365 @@
+"""
+Filters for pulsar telescope time series.
+
+These work on NumPy arrays of samples, block by block, so that long
+captures can be filtered without making several copies of them.
+"""
+
+import warnings
+from collections import deque
+from heapq import heappop, heappush
+
+import numpy as np
+
+# The largest number of samples to hold in temporary arrays at once.
+_BLOCK_ELEMENTS = 1 << 22
+
+
+def normalise_blocks(data, block, out=None):
+    """
+    Divide the samples in each block of a time series by the variance of
+    that block, ignoring NaNs.
+
+    The blocks are views of the data, and their variances are found a
+    group of blocks at a time, so no padded copy of the data is made.
+    A final partial block is normalised by its own variance.
+
+    Parameters
+    ----------
+    data : numpy.ndarray
+       The samples.
+    block : int
+       The number of samples in each block.
+    out : numpy.ndarray, optional
+       The array to write the normalised samples to. This may be `data`
+       itself, to normalise in place. By default a new array is made.
+
+    Returns
+    -------
+    numpy.ndarray
+       The normalised samples.
+    """
+    block = int(block)
+    if out is None:
+        out = np.empty(data.shape, dtype=np.result_type(data.dtype, np.float32))
+    n_full = len(data)//block
+    rows = data[:n_full*block].reshape(n_full, block)
+    rows_out = out[:n_full*block].reshape(n_full, block)
+    group = max(1, _BLOCK_ELEMENTS//block)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for first in range(0, n_full, group):
+            variance = np.nanvar(rows[first:first+group], axis=1)
+            np.divide(rows[first:first+group], variance[:, None], out=rows_out[first:first+group])
+        if n_full*block < len(data):
+            tail = data[n_full*block:]
+            np.divide(tail, np.nanvar(tail), out=out[n_full*block:])
+    return out
+
+
+def _window_stats(data, firsts, window):
+    # The median and median absolute deviation of the windows of `window`
+    # samples starting at each of `firsts`, ignoring NaNs. The windows
+    # are copied a group at a time.
+    median = np.empty(len(firsts))
+    mad = np.empty(len(firsts))
+    offsets = np.arange(window)
+    group = max(1, _BLOCK_ELEMENTS//window)
+    with warnings.catch_warnings():
+        # Windows which are all NaN have a NaN median
+        warnings.simplefilter('ignore', RuntimeWarning)
+        for first in range(0, len(firsts), group):
+            rows = data[firsts[first:first+group, None] + offsets]
+            median[first:first+group] = np.nanmedian(rows, axis=1)
+            rows -= median[first:first+group, None]
+            mad[first:first+group] = np.nanmedian(np.abs(rows), axis=1)
+    return median, mad
+
+
+def mad_outliers(data, window, sigma):
+    """
+    Find the samples which lie far from the median of the window around
+    them.
+
+    A sample is an outlier if it is more than `sigma` standard
+    deviations from the median of a window of `window` samples around
+    it. The standard deviation is estimated from the median absolute
+    deviation, so it is not inflated by the outliers themselves. NaNs
+    are ignored, and are never outliers.
+
+    Rather than a window centred on every sample, the windows overlap by
+    half their length, and each sample is judged against the window
+    whose centre is nearest to it, so it is never more than a quarter
+    of a window from the centre. This lets the medians be found for
+    many windows at once.
+
+    Parameters
+    ----------
+    data : numpy.ndarray
+       The samples.
+    window : int
+       The number of samples in each window.
+    sigma : float
+       The threshold, in standard deviations.
+
+    Returns
+    -------
+    numpy.ndarray
+       True for each sample which is an outlier.
+    """
+    outliers = np.zeros(data.shape, dtype=bool)
+    if not len(data):
+        return outliers
+    window = min(max(int(window), 1), len(data))
+    hop = max(window//2, 1)
+    # The window of the samples from i*hop to (i+1)*hop is centred on them
+    centres = np.arange(0, len(data), hop) + hop//2
+    median, mad = _window_stats(data, np.clip(centres - window//2, 0, len(data) - window), window)
+    threshold = sigma*1.4826*mad
+    chunk = max(hop, _BLOCK_ELEMENTS//hop*hop)
+    with np.errstate(invalid='ignore'):
+        for first in range(0, len(data), chunk):
+            which = np.arange(first, min(first + chunk, len(data)))//hop
+            outliers[first:first+chunk] = np.abs(data[first:first+chunk] - median[which]) > threshold[which]
+    return outliers
+
+
+class RunningPercentile(object):
+    """
+    A percentile of the most recent values in a stream.
+
+    The values in the window below the percentile are kept in a max-heap,
+    and those above it in a min-heap, so the percentile is always the
+    top of the lower heap. Values leaving the window are only removed
+    from the heaps when they reach the top, so each new value takes
+    O(log k) time for a window of k values. NaNs take up a place in the
+    window but are left out of the heaps, so the percentile is of the
+    valid values in the window, and is NaN if there are none.
+
+    The state is kept between calls, so a long time series can be
+    filtered in chunks, and gives the same result as filtering it at
+    once.
+
+    Parameters
+    ----------
+    window : int
+       The number of values in the window.
+    q : float, optional
+       The percentile, between 0 and 100. The value with rank nearest
+       to q/100*(n-1) of the n valid values is returned, which for the
+       median of an even number of values is the upper of the two
+       middle values. Default is 50.
+    """
+
+    def __init__(self, window, q=50.0):
+        self.window = int(window)
+        self.q = q
+        self._values = deque()
+        self._low, self._high = [], []
+        self._nlow, self._nhigh = 0, 0
+        self._delayed = {}
+
+    def _prune(self, heap, sign):
+        # Discard values at the top of a heap which have left the window
+        delayed = self._delayed
+        while heap and sign*heap[0] in delayed:
+            value = sign*heappop(heap)
+            delayed[value] -= 1
+            if not delayed[value]:
+                del delayed[value]
+
+    def _balance(self):
+        n = self._nlow + self._nhigh
+        target = int(self.q/100.0*(n - 1) + 0.5) + 1 if n else 0
+        while self._nlow > target:
+            heappush(self._high, -heappop(self._low))
+            self._nlow, self._nhigh = self._nlow - 1, self._nhigh + 1
+            self._prune(self._low, -1)
+        while self._nlow < target:
+            heappush(self._low, -heappop(self._high))
+            self._nlow, self._nhigh = self._nlow + 1, self._nhigh - 1
+            self._prune(self._high, 1)
+
+    def _add(self, value):
+        if self._nlow and value <= -self._low[0]:
+            heappush(self._low, -value)
+            self._nlow += 1
+        else:
+            heappush(self._high, value)
+            self._nhigh += 1
+
+    def _remove(self, value):
+        self._delayed[value] = self._delayed.get(value, 0) + 1
+        if self._nlow and value <= -self._low[0]:
+            self._nlow -= 1
+            self._prune(self._low, -1)
+        else:
+            self._nhigh -= 1
+            self._prune(self._high, 1)
+
+    def push(self, value):
+        """
+        Add a value to the window, removing the oldest value if the
+        window is full, and return the percentile of the window.
+        """
+        if len(self._values) == self.window:
+            old = self._values.popleft()
+            if old == old:
+                self._remove(old)
+        self._values.append(value)
+        if value == value:
+            self._add(value)
+        self._balance()
+        return -self._low[0] if self._nlow else np.nan
+
+    def filter(self, data, out=None):
+        """
+        Push every value of `data` in turn, and return the percentile of
+        the window after each one.
+        """
+        if out is None:
+            out = np.empty(len(data))
+        push = self.push
+        for i, value in enumerate(np.asarray(data, dtype=np.float64).tolist()):
+            out[i] = push(value)
+        return out
+
+
+class RunningMedian(RunningPercentile):
+    """
+    The median of the most recent values in a stream.
+
+    Parameters
+    ----------
+    window : int
+       The number of values in the window.
+    """
+
+    def __init__(self, window):
+        super(RunningMedian, self).__init__(window, 50.0)
+
+
+def running_percentile(data, window, q=50.0, chunk=1 << 16, out=None):
+    """
+    Calculate a percentile over a window centred on each sample, such as
+    a running median for subtracting the baseline of a time series.
+
+    The time series is passed through a `RunningPercentile` in chunks,
+    so it may be a memory-mapped capture. The windows are cut short at
+    each end of the series, and NaNs are ignored.
+
+    Parameters
+    ----------
+    data : numpy.ndarray
+       The samples.
+    window : int
+       The number of samples in the window. Even windows are extended
+       by one sample so they can be centred.
+    q : float, optional
+       The percentile, between 0 and 100. Default is 50.
+    chunk : int, optional
+       The number of samples to pass through at once.
+    out : numpy.ndarray, optional
+       The array to write the percentiles to.
+
+    Returns
+    -------
+    numpy.ndarray
+       The percentile of the window around each sample.
+    """
+    half = int(window)//2
+    if out is None:
+        out = np.empty(len(data))
+    running = RunningPercentile(2*half + 1, q)
+    # The window ending at sample i + half is centred on sample i
+    running.filter(data[:half])
+    for first in range(0, len(data), chunk):
+        block = data[first+half:first+half+chunk]
+        if len(block) < min(chunk, len(data) - first):
+            block = np.append(block, np.full(min(chunk, len(data) - first) - len(block), np.nan))
+        running.filter(block, out=out[first:first+chunk])
+    return out
+
+
+class RFIExcision(object):
+    """
+    Flags bursts of interference in a time series, block by block.
+
+    The series is divided into steps of half a window. A sample is
+    flagged if it lies more than `sigma` robust standard deviations from
+    the median of the `window` samples before the step it is in, with
+    the standard deviation estimated from the median absolute deviation
+    of those samples. The medians of all the steps in a block are found
+    at once. The samples before a block are carried over to the next,
+    so a capture can be passed through in blocks of any size and gives
+    the same flags as if it were passed through at once.
+
+    The first `window` samples of a stream only fill the windows, and
+    are not flagged unless they are NaN.
+
+    Flagged samples are set to zero in the output. Folding only counts
+    non-zero samples, so flagged samples are ignored by the fold without
+    any extra work.
+
+    Parameters
+    ----------
+    window : int
+       The number of samples in the windows.
+    sigma : float, optional
+       The threshold, in robust standard deviations. Default is 5.
+    """
+
+    def __init__(self, window, sigma=5.0):
+        self.window = max(int(window), 1)
+        self.sigma = sigma
+        self._step = max(self.window//2, 1)
+        self._history = np.zeros(0)
+        self._seen = 0
+
+    def process(self, block):
+        """
+        Flag the interference in the next block of a time series.
+
+        Parameters
+        ----------
+        block : numpy.ndarray
+           The samples in the block. NaN samples are always flagged.
+
+        Returns
+        -------
+        data : numpy.ndarray
+           The samples, with flagged samples set to zero.
+        mask : numpy.ndarray
+           True for each flagged sample.
+        """
+        data = np.asarray(block, dtype=np.float64)
+        mask = ~np.isfinite(data)
+        if not len(data):
+            return data.copy(), mask
+        step, window, first = self._step, self.window, self._seen
+        stream = np.concatenate((self._history, data))
+        # The index in the whole series of the first sample in `stream`
+        base = first - len(self._history)
+        steps = np.arange(first//step, (first + len(data) - 1)//step + 1)*step
+        median = np.full(len(steps), np.nan)
+        mad = np.full(len(steps), np.nan)
+        ready = steps >= window
+        if ready.any():
+            median[ready], mad[ready] = _window_stats(stream, steps[ready] - window - base, window)
+        which = (np.arange(first, first + len(data)) - steps[0])//step
+        with np.errstate(invalid='ignore'):
+            mask |= np.abs(data - median[which]) > self.sigma*1.4826*mad[which]
+        # Keep enough samples for the windows of the steps in the next block
+        self._history = stream[-(window + step):]
+        self._seen += len(data)
+        return np.where(mask, 0.0, data), mask
+
+    def filter(self, data, block=1 << 16):
+        """
+        Flag the interference in a whole time series, passing it through
+        in blocks of `block` samples.
+        """
+        cleaned = np.empty(len(data))
+        mask = np.empty(len(data), dtype=bool)
+        for first in range(0, len(data), block):
+            cleaned[first:first+block], mask[first:first+block] = self.process(data[first:first+block])
+        return cleaned, mask
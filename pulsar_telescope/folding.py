@@ -0,0 +1,326 @@
+"""
+Folding of pulsar time series.
+
+The samples of a time series are folded by assigning each one a bin
+within the pulse period, from its pulse phase, and a column of the
+stack, and summing the samples which fall in each bin of the stack.
+This is done for all of the samples at once with `np.bincount`.
+"""
+
+import os
+
+import numpy as np
+
+_predictors = {}
+
+
+class PhasePredictor(object):
+    """
+    Predicts the pulse phase of a pulsar at any time from an ephemeris.
+
+    Like a set of TEMPO polycos, the phase is stored as a polynomial in
+    time for each span of the ephemeris, so the phase at millions of
+    sample times is found with one lookup of the span and one
+    polynomial evaluation. The frequency is interpolated linearly
+    between the rows of the ephemeris, so the phase over each span is
+    its exact integral, a quadratic. Outside the ephemeris the first and
+    last spans are extrapolated.
+
+    Parameters
+    ----------
+    times : array-like
+       The times of the ephemeris rows, in GPS seconds.
+    frequencies : array-like
+       The pulse frequency at each time, in Hz.
+    """
+
+    def __init__(self, times, frequencies):
+        times = np.atleast_1d(np.asarray(times, dtype=np.float64))
+        frequencies = np.atleast_1d(np.asarray(frequencies, dtype=np.float64))
+        order = np.argsort(times)
+        times, frequencies = times[order], frequencies[order]
+        if len(times) == 1:
+            self.epochs = times
+            self.coeffs = np.array([[0.0, frequencies[0], 0.0]])
+            return
+        span = np.diff(times)
+        fdot = np.diff(frequencies)/span
+        phase = np.concatenate(([0.0], np.cumsum(frequencies[:-1]*span + 0.5*fdot*span**2)))
+        self.epochs = times[:-1]
+        # Coefficients of 1, dt and dt**2, where dt is the time since the
+        # start of the span.
+        self.coeffs = np.column_stack((phase[:-1], frequencies[:-1], 0.5*fdot))
+
+    @classmethod
+    def from_file(cls, ephemeris):
+        """
+        Make a predictor from an ephemeris file, which has columns of
+        GPS time and pulse frequency.
+        """
+        table = np.atleast_2d(np.genfromtxt(ephemeris))
+        return cls(table[:, 0], table[:, 1])
+
+    def _spans(self, times):
+        times = np.asarray(times, dtype=np.float64)
+        span = np.clip(np.searchsorted(self.epochs, times, side='right') - 1, 0, len(self.epochs) - 1)
+        return span, times - self.epochs[span]
+
+    def phase(self, times):
+        """
+        Return the pulse phase in cycles at each of `times`, measured
+        from the start of the ephemeris.
+        """
+        span, dt = self._spans(times)
+        coeffs = self.coeffs[span]
+        phase = coeffs[..., -1]
+        for i in range(self.coeffs.shape[1] - 2, -1, -1):
+            phase = phase*dt + coeffs[..., i]
+        return phase
+
+    def frequency(self, times):
+        """
+        Return the pulse frequency in Hz at each of `times`.
+        """
+        span, dt = self._spans(times)
+        return self.coeffs[span, 1] + 2*self.coeffs[span, 2]*dt
+
+    def fdot(self, times):
+        """
+        Return the rate of change of the pulse frequency at each of
+        `times`.
+        """
+        span, _ = self._spans(times)
+        return 2*self.coeffs[span, 2]
+
+
+def load_predictor(ephemeris):
+    """
+    Return the phase predictor for an ephemeris file. The predictor is
+    only built again if the file has changed since it was last loaded.
+    """
+    key = (os.path.abspath(ephemeris), os.path.getmtime(ephemeris))
+    if key not in _predictors:
+        _predictors[key] = PhasePredictor.from_file(ephemeris)
+    return _predictors[key]
+
+
+def fold_shape(n_samples, frequency, samp_rate):
+    """
+    Return the shape of the stack a time series is folded into.
+
+    Parameters
+    ----------
+    n_samples : int
+       The number of samples in the time series.
+    frequency : float
+       The pulse frequency, in Hz.
+    samp_rate : float
+       The sample rate, in samples per second.
+
+    Returns
+    -------
+    tuple
+       The number of phase bins, which is the number of whole samples
+       in one period, and the number of columns.
+    """
+    period_s = int(np.floor(samp_rate*(1.0/frequency)))
+    number_p = int(np.floor(n_samples/float(period_s)))
+    return period_s, number_p + 1
+
+
+def fold_indices(phase, frequency, samp_rate):
+    """
+    Calculate the stack bin of each sample from its pulse phase.
+
+    Parameters
+    ----------
+    phase : numpy.ndarray
+       The pulse phase of each sample, in cycles.
+    frequency : float
+       The pulse frequency, in Hz.
+    samp_rate : float
+       The sample rate, in samples per second.
+
+    Returns
+    -------
+    phasey : numpy.ndarray
+       The phase bin of each sample.
+    period : numpy.ndarray
+       The column of the stack for each sample.
+    """
+    period_s = int(np.floor(samp_rate*(1.0/frequency)))
+    phase_b = np.round((phase % 1)*(1.0/frequency)*samp_rate).astype(np.int64)
+    return phase_b % period_s, phase_b // period_s
+
+
+def accumulate(data, phasey, period, shape, stack=None, stackcount=None):
+    """
+    Sum samples into the bins of a stack.
+
+    Parameters
+    ----------
+    data : numpy.ndarray
+       The samples.
+    phasey, period : numpy.ndarray
+       The phase bin and column of each sample, from `fold_indices`.
+    shape : tuple
+       The shape of the stack.
+    stack, stackcount : numpy.ndarray, optional
+       Existing stacks to add the samples to. New ones are made if
+       these are not given.
+
+    Returns
+    -------
+    stack : numpy.ndarray
+       The sum of the samples in each bin.
+    stackcount : numpy.ndarray
+       The number of non-zero samples in each bin.
+    """
+    size = shape[0]*shape[1]
+    if stack is None:
+        stack = np.zeros(shape)
+    if stackcount is None:
+        stackcount = np.zeros(shape)
+    index = phasey*shape[1] + period
+    stack += np.bincount(index, weights=data, minlength=size)[:size].reshape(shape)
+    stackcount += np.bincount(index[data != 0], minlength=size)[:size].reshape(shape)
+    return stack, stackcount
+
+
+def fold(data, phase, frequency, samp_rate, mask=None):
+    """
+    Fold a time series.
+
+    Parameters
+    ----------
+    data : numpy.ndarray
+       The samples.
+    phase : numpy.ndarray
+       The pulse phase of each sample, in cycles.
+    frequency : float
+       The pulse frequency, in Hz.
+    samp_rate : float
+       The sample rate, in samples per second.
+    mask : numpy.ndarray, optional
+       True for each sample which should be left out of the fold, such
+       as those flagged by `filters.RFIExcision`.
+
+    Returns
+    -------
+    stack : numpy.ndarray
+       The sum of the samples in each bin, with one row per phase bin.
+    stackcount : numpy.ndarray
+       The number of non-zero samples in each bin.
+    """
+    shape = fold_shape(len(data), frequency, samp_rate)
+    phasey, period = fold_indices(phase, frequency, samp_rate)
+    if mask is not None:
+        # Zero samples are not counted in the stack
+        data = np.where(mask, 0.0, data)
+    return accumulate(data, phasey, period, shape)
+
+
+class FoldAccumulator(object):
+    """
+    Folds a time series block by block as it is recorded, so that the
+    pulse profile can be watched while an observation is running.
+
+    The stack has one row per phase bin and one column per
+    sub-integration, and grows as blocks arrive. Adding a block takes
+    time in proportion to the length of the block, not to the length of
+    the observation so far.
+
+    Parameters
+    ----------
+    ephemeris : str, PhasePredictor or float
+       The ephemeris file, a predictor made from one, or a constant
+       pulse frequency in Hz.
+    samp_rate : float
+       The sample rate, in samples per second.
+    start : float
+       The GPS time of the first sample.
+    nbins : int, optional
+       The number of phase bins. By default this is the number of whole
+       samples in one period, as in `fold`.
+    subint : float, optional
+       The duration of each sub-integration, in seconds. Default is 60.
+    """
+
+    def __init__(self, ephemeris, samp_rate, start, nbins=None, subint=60.0):
+        if isinstance(ephemeris, PhasePredictor):
+            self.predictor = ephemeris
+        elif isinstance(ephemeris, str):
+            self.predictor = load_predictor(ephemeris)
+        else:
+            self.predictor = PhasePredictor([start], [ephemeris])
+        self.samp_rate = float(samp_rate)
+        self.start = start
+        if nbins is None:
+            nbins = int(np.floor(self.samp_rate/self.predictor.frequency(start)))
+        self.nbins = nbins
+        self.subint = float(subint)
+        self.samples = 0
+        self.nsub = 0
+        self._stack = np.zeros((nbins, 1))
+        self._stackcount = np.zeros((nbins, 1))
+
+    @property
+    def stack(self):
+        """The sum of the samples in each phase bin and sub-integration."""
+        return self._stack[:, :self.nsub]
+
+    @property
+    def stackcount(self):
+        """The number of non-zero samples in each bin of the stack."""
+        return self._stackcount[:, :self.nsub]
+
+    @property
+    def profile(self):
+        """The mean of the samples in each phase bin so far."""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return self.stack.sum(axis=1)/self.stackcount.sum(axis=1)
+
+    def _grow(self, nsub):
+        # Double the number of columns as needed, so that growing the
+        # stack costs constant time per column on average.
+        if nsub > self._stack.shape[1]:
+            columns = max(nsub, 2*self._stack.shape[1])
+            for name in ('_stack', '_stackcount'):
+                grown = np.zeros((self.nbins, columns))
+                grown[:, :self.nsub] = getattr(self, name)[:, :self.nsub]
+                setattr(self, name, grown)
+        self.nsub = max(self.nsub, nsub)
+
+    def add(self, data, times=None, mask=None):
+        """
+        Fold a block of samples into the stack.
+
+        Parameters
+        ----------
+        data : numpy.ndarray
+           The samples in the block.
+        times : numpy.ndarray, optional
+           The GPS time of each sample. By default the block is taken to
+           follow on from the previous one without a gap.
+        mask : numpy.ndarray, optional
+           True for each sample which should be left out of the fold.
+
+        Returns
+        -------
+        FoldAccumulator
+           This accumulator.
+        """
+        data = np.asarray(data, dtype=np.float64)
+        if mask is not None:
+            data = np.where(mask, 0.0, data)
+        if times is None:
+            times = self.start + (self.samples + np.arange(len(data)))/self.samp_rate
+        self.samples += len(data)
+        if len(data) == 0:
+            return self
+        phase = self.predictor.phase(times)
+        phasey = np.minimum(((phase % 1)*self.nbins).astype(np.int64), self.nbins - 1)
+        period = np.maximum(((times - self.start)/self.subint).astype(np.int64), 0)
+        self._grow(int(period.max()) + 1)
+        accumulate(data, phasey, period, self._stack.shape, self._stack, self._stackcount)
+        return self
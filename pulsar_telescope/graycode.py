@@ -0,0 +1,65 @@
+"""
+Gray codes.
+
+A Gray code orders the integers so that consecutive values differ in a
+single bit, which is how the telescope's shaft encoder reports its
+position. The code of an integer n is n ^ (n >> 1), and an integer is
+recovered from its code by accumulating the exclusive or of every
+right shift of the code. Both work on whole NumPy arrays, so the tables
+for an encoder of any resolution can be made when they are needed.
+"""
+
+import numpy as np
+
+
+def _dtype(bits):
+    # The smallest unsigned integer type holding codes of `bits` bits
+    for dtype in (np.uint8, np.uint16, np.uint32, np.uint64):
+        if bits <= 8*np.dtype(dtype).itemsize:
+            return dtype
+    raise ValueError("Gray codes of more than 64 bits are not supported.")
+
+
+def encode(n):
+    """
+    Return the Gray code of an integer, or of each of an array of
+    integers.
+    """
+    n = np.asarray(n)
+    return n ^ (n >> 1)
+
+
+def decode(code, bits=64):
+    """
+    Return the integer whose Gray code is `code`, or of each of an array
+    of codes, for codes of up to `bits` bits.
+    """
+    n = np.array(code)
+    shift = 1
+    while shift < bits:
+        n ^= n >> shift
+        shift <<= 1
+    return n
+
+
+def encode_table(bits):
+    """
+    Return the Gray code of every integer of `bits` bits, in order.
+    """
+    return encode(np.arange(1 << bits, dtype=_dtype(bits)))
+
+
+def decode_table(bits):
+    """
+    Return the integer for every Gray code of `bits` bits, indexed by
+    the code.
+    """
+    return decode(np.arange(1 << bits, dtype=_dtype(bits)), bits)
+
+
+def to_strings(codes, bits):
+    """
+    Return each of an array of codes as a string of `bits` 0s and 1s,
+    highest bit first.
+    """
+    return [np.binary_repr(int(code), width=bits) for code in np.atleast_1d(codes)]
@@ -0,0 +1,268 @@
+"""
+Reading of GNU Radio file metadata.
+
+The file metadata sink in GNU Radio writes a fixed-length header,
+optionally followed by a dictionary of extra tags, before each segment
+of a capture. With detached headers these are written to a `.hdr` file
+alongside the capture. Each header is a serialised PMT dictionary; the
+functions here decode the small subset of PMT types which the sink
+writes, so that the whole header file can be read in one pass without
+going through GNU Radio.
+"""
+
+import json, struct
+
+import numpy as np
+
+# The length in bytes of a serialised header, without extra tags.
+HEADER_LENGTH = 149
+
+# One record per header, in file order. `offset` is the index of the
+# first sample in the segment which the header describes.
+HEADER_DTYPE = np.dtype([('offset', np.int64),
+                         ('version', np.int32),
+                         ('rx_time', np.float64),
+                         ('rx_rate', np.float64),
+                         ('size', np.int32),
+                         ('type', np.int32),
+                         ('cplx', np.bool_),
+                         ('hdr_len', np.int64),
+                         ('extra_len', np.int64),
+                         ('nitems', np.int64),
+                         ('nbytes', np.int64)])
+
+# One record per extra tag, indexed by the sample it applies to.
+TAG_DTYPE = np.dtype([('offset', np.int64),
+                      ('key', 'U32'),
+                      ('value', object)])
+
+# One record per overrun: the first sample after the gap, and the unix
+# time of that sample.
+OVERRUN_DTYPE = np.dtype([('new_seg', np.int64),
+                          ('new_time', np.float64)])
+
+# PMT serialisation type codes
+PST_TRUE, PST_FALSE, PST_SYMBOL, PST_INT32, PST_DOUBLE, PST_COMPLEX = range(6)
+PST_NULL, PST_PAIR, PST_VECTOR, PST_DICT, PST_UNIFORM_VECTOR = range(6, 11)
+PST_UINT64, PST_TUPLE, PST_INT64 = range(11, 14)
+
+# Element types of PMT uniform vectors
+_UVEC_TYPES = ['>u1', '>i1', '>u2', '>i2', '>u4', '>i4', '>u8', '>i8',
+               '>f4', '>f8', '>c8', '>c16']
+
+
+class _Pair(tuple):
+    pass
+
+
+def deserialize(buf, pos=0):
+    """
+    Decode a serialised PMT from a buffer.
+
+    Parameters
+    ----------
+    buf : bytearray
+       The buffer containing the serialised PMT.
+    pos : int, optional
+       The position of the PMT in the buffer. Default is 0.
+
+    Returns
+    -------
+    value
+       The decoded value. Dictionaries are returned as `dict`, tuples
+       and vectors as `tuple`, and symbols as `str`.
+    pos : int
+       The position in the buffer following the PMT.
+    """
+    code = buf[pos]
+    pos += 1
+    if code == PST_TRUE:
+        return True, pos
+    elif code == PST_FALSE:
+        return False, pos
+    elif code == PST_NULL:
+        return None, pos
+    elif code == PST_SYMBOL:
+        length, = struct.unpack_from('>H', buf, pos)
+        pos += 2
+        return bytes(buf[pos:pos+length]).decode('ascii'), pos + length
+    elif code == PST_INT32:
+        return struct.unpack_from('>i', buf, pos)[0], pos + 4
+    elif code == PST_INT64:
+        return struct.unpack_from('>q', buf, pos)[0], pos + 8
+    elif code == PST_UINT64:
+        return struct.unpack_from('>Q', buf, pos)[0], pos + 8
+    elif code == PST_DOUBLE:
+        return struct.unpack_from('>d', buf, pos)[0], pos + 8
+    elif code == PST_COMPLEX:
+        real, imag = struct.unpack_from('>dd', buf, pos)
+        return complex(real, imag), pos + 16
+    elif code in (PST_PAIR, PST_DICT):
+        car, pos = deserialize(buf, pos)
+        cdr, pos = deserialize(buf, pos)
+        if isinstance(car, _Pair) and (cdr is None or isinstance(cdr, dict)):
+            # A dictionary is a list of (key, value) pairs
+            items = dict(cdr or {})
+            items[car[0]] = car[1]
+            return items, pos
+        return _Pair((car, cdr)), pos
+    elif code in (PST_VECTOR, PST_TUPLE):
+        length, = struct.unpack_from('>I', buf, pos)
+        pos += 4
+        items = []
+        for _ in range(length):
+            item, pos = deserialize(buf, pos)
+            items.append(item)
+        return tuple(items), pos
+    elif code == PST_UNIFORM_VECTOR:
+        kind, length, npad = struct.unpack_from('>BIB', buf, pos)
+        pos += 6 + npad
+        dtype = np.dtype(_UVEC_TYPES[kind])
+        nbytes = length*dtype.itemsize
+        return np.frombuffer(bytes(buf[pos:pos+nbytes]), dtype=dtype), pos + nbytes
+    raise ValueError("Unknown PMT type {0} at byte {1}.".format(code, pos - 1))
+
+
+def _timestamp(value):
+    # Timestamps are stored as a (whole seconds, fractional seconds) tuple
+    if isinstance(value, tuple):
+        return float(value[0]) + float(value[1])
+    return float(value)
+
+
+def read_headers(head_file):
+    """
+    Read every header in a detached GNU Radio metadata file.
+
+    The file is read in a single pass, and the cost scales with the
+    number of headers in it rather than the number of samples in the
+    capture.
+
+    Parameters
+    ----------
+    head_file : str
+       The location of the `.hdr` file.
+
+    Returns
+    -------
+    headers : numpy.ndarray
+       A structured array of `HEADER_DTYPE`, one record per header.
+    tags : numpy.ndarray
+       A structured array of `TAG_DTYPE`, one record per extra tag,
+       with the offset of the sample it applies to.
+    """
+    with open(head_file, 'rb') as fd:
+        buf = bytearray(fd.read())
+
+    headers, tags = [], []
+    pos, offset = 0, 0
+    while pos + HEADER_LENGTH <= len(buf):
+        header, _ = deserialize(buf, pos)
+        pos += HEADER_LENGTH
+        size = header.get('size', 1)
+        hdr_len = header.get('strt', HEADER_LENGTH)
+        extra_len = hdr_len - HEADER_LENGTH
+        nbytes = header.get('bytes', 0)
+        nitems = nbytes // size if size else 0
+        if extra_len > 0:
+            if pos + extra_len > len(buf):
+                break
+            extra, _ = deserialize(buf, pos)
+            pos += extra_len
+            for key, value in sorted(extra.items()):
+                tags.append((offset, key, value))
+        headers.append((offset,
+                        header.get('version', 0),
+                        _timestamp(header.get('rx_time', np.nan)),
+                        header.get('rx_rate', np.nan),
+                        size,
+                        header.get('type', 0),
+                        header.get('cplx', False),
+                        hdr_len,
+                        extra_len,
+                        nitems,
+                        nbytes))
+        offset += nitems
+
+    return np.array(headers, dtype=HEADER_DTYPE), np.array(tags, dtype=TAG_DTYPE)
+
+
+def find_overruns(headers):
+    """
+    Find the headers at which samples were dropped.
+
+    A header continues the previous segment if its timestamp is
+    unchanged, or if it follows on from the end of the previous segment
+    to within half a sample. Any other change of timestamp marks an
+    overrun.
+
+    Parameters
+    ----------
+    headers : numpy.ndarray
+       A structured array of `HEADER_DTYPE`, as returned by
+       `read_headers`.
+
+    Returns
+    -------
+    numpy.ndarray
+       A structured array of `OVERRUN_DTYPE`, one record per overrun.
+    """
+    if len(headers) < 2:
+        return np.zeros(0, dtype=OVERRUN_DTYPE)
+    rx_time, rx_rate = headers['rx_time'], headers['rx_rate']
+    expected = rx_time[:-1] + headers['nitems'][:-1]/rx_rate[:-1]
+    with np.errstate(invalid='ignore'):
+        continued = (rx_time[1:] == rx_time[:-1]) | (np.abs(rx_time[1:] - expected) < 0.5/rx_rate[1:])
+    jumps = np.flatnonzero(~continued & np.isfinite(rx_time[1:])) + 1
+    overs = np.zeros(len(jumps), dtype=OVERRUN_DTYPE)
+    overs['new_seg'] = headers['offset'][jumps]
+    overs['new_time'] = rx_time[jumps]
+    return overs
+
+
+def _encode(value):
+    # Mark the tag values which JSON would otherwise change the type of
+    if isinstance(value, tuple):
+        return {'tuple': [_encode(item) for item in value]}
+    if isinstance(value, dict):
+        return {'dict': [[_encode(key), _encode(item)] for key, item in value.items()]}
+    if isinstance(value, complex):
+        return {'complex': [value.real, value.imag]}
+    if isinstance(value, np.ndarray):
+        return {'array': value.tolist(), 'dtype': value.dtype.str}
+    return value
+
+
+def _decode(value):
+    if isinstance(value, dict):
+        if 'tuple' in value:
+            return tuple(_decode(item) for item in value['tuple'])
+        if 'dict' in value:
+            return dict((_decode(key), _decode(item)) for key, item in value['dict'])
+        if 'complex' in value:
+            return complex(*value['complex'])
+        if 'array' in value:
+            return np.array(value['array'], dtype=value['dtype'])
+    return value
+
+
+def tags_to_json(tags):
+    """
+    Return the extra tags of a capture as a JSON string, so that they
+    can be stored without pickling their values.
+
+    Parameters
+    ----------
+    tags : numpy.ndarray
+       A structured array of `TAG_DTYPE`, as returned by `read_headers`.
+    """
+    return json.dumps([[int(tag['offset']), str(tag['key']), _encode(tag['value'])] for tag in tags])
+
+
+def tags_from_json(text):
+    """
+    Return the extra tags stored by `tags_to_json`, as a structured
+    array of `TAG_DTYPE`.
+    """
+    tags = [(offset, key, _decode(value)) for offset, key, value in json.loads(text)]
+    return np.array(tags, dtype=TAG_DTYPE)
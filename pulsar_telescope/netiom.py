@@ -0,0 +1,265 @@
+"""
+Communication with the NETIOM card on the telescope mount.
+
+The NETIOM is controlled over HTTP. A request for the root page with a
+command as the query string, such as `?A09`, sets or clears an output
+pin, and the `.cgi` pages it serves report the state of its inputs and
+outputs. Opening a new connection for every command makes each one as
+slow as a TCP handshake with the card, so `HTTPTransport` keeps one
+connection open and reuses it, reconnecting when the card closes it.
+
+The transport used by a `Drive` can be replaced, and `FakeNetiom`
+serves the same pages from a local thread, so that the drive can be
+tested without the telescope.
+"""
+
+import logging, socket, sys, threading, time
+
+try:
+    from http.client import HTTPConnection, HTTPException
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import urlsplit
+except ImportError:
+    from httplib import HTTPConnection, HTTPException
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urlparse import urlsplit
+
+# The separator between commands sent in a single request.
+COMMAND_SEPARATOR = '&'
+
+
+class HTTPTransport(object):
+    """
+    A persistent HTTP connection to the NETIOM.
+
+    Parameters
+    ----------
+    url : str
+       The address of the card, such as 'http://192.168.0.6/'.
+    timeout : float, optional
+       The longest time to wait for the card to respond to a request,
+       in seconds. Default is 1.
+    retries : int, optional
+       The number of times to retry a request which fails, on a new
+       connection. Default is 3.
+    backoff : float, optional
+       The time to wait before the first retry, in seconds. The wait is
+       doubled for each retry after that. Default is 0.05.
+    """
+
+    def __init__(self, url, timeout=1.0, retries=3, backoff=0.05):
+        parts = urlsplit(url)
+        self.url = url
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.root = parts.path or '/'
+        if not self.root.endswith('/'):
+            self.root += '/'
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.logger = logging.getLogger('PT.Netiom')
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._connection is None:
+            self._connection = HTTPConnection(self.host, self.port, timeout=self.timeout)
+        return self._connection
+
+    def close(self):
+        """
+        Close the connection to the card. It is reopened by the next
+        request.
+        """
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def request(self, page='', query=None):
+        """
+        Request a page from the card, retrying on a new connection if
+        the request fails.
+
+        Parameters
+        ----------
+        page : str, optional
+           The page, relative to the address of the card. By default
+           the root page.
+        query : str, optional
+           The query string, such as a command.
+
+        Returns
+        -------
+        str
+           The body of the response.
+
+        Raises
+        ------
+        IOError
+           If the request still fails after every retry.
+        """
+        path = self.root + page
+        if query:
+            path += '?' + query
+        with self._lock:
+            for attempt in range(self.retries + 1):
+                try:
+                    connection = self._connect()
+                    connection.request('GET', path, headers={'Connection': 'keep-alive'})
+                    response = connection.getresponse()
+                    body = response.read()
+                    if response.status != 200:
+                        raise HTTPException("The card returned status {0}".format(response.status))
+                    return body.decode('ascii', 'replace')
+                except (HTTPException, IOError) as error:
+                    # The card may have closed the connection, so the
+                    # next attempt opens a new one.
+                    self.close()
+                    if attempt == self.retries:
+                        raise IOError("Request for {0} failed: {1}".format(path, error))
+                    self.logger.warning("Request for {0} failed, retrying: {1}".format(path, error))
+                    time.sleep(self.backoff*2**attempt)
+
+    def send(self, command):
+        """
+        Send a command, such as 'A09', to the card.
+        """
+        self.request('', command)
+
+    def lines(self, page):
+        """
+        Request a page from the card and return its lines.
+        """
+        return self.request(page).splitlines()
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def handle_error(self, request, client_address):
+        # Connections kept alive are dropped when the card is stopped
+        if isinstance(sys.exc_info()[1], socket.error):
+            return
+        HTTPServer.handle_error(self, request, client_address)
+
+
+class _NetiomHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        BaseHTTPRequestHandler.setup(self)
+        self.server.card._connections.add(self.connection)
+
+    def finish(self):
+        self.server.card._connections.discard(self.connection)
+        BaseHTTPRequestHandler.finish(self)
+
+    def do_GET(self):
+        card = self.server.card
+        if card.latency:
+            time.sleep(card.latency)
+        path, _, query = self.path.partition('?')
+        body = card.respond(path.lstrip('/'), query)
+        if body is None:
+            self.send_error(404)
+            return
+        body = body.encode('ascii')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeNetiom(object):
+    """
+    A local HTTP server which behaves like the NETIOM card, for testing.
+
+    Commands of the form 'Ann' set output pin nn high and 'Bnn' set it
+    low, and several can be sent in one request, separated by
+    `COMMAND_SEPARATOR`. The `.cgi` pages report the outputs and the `inputs`, which
+    can be set to make the card report an encoder position.
+
+    Parameters
+    ----------
+    latency : float, optional
+       A delay added to every request, in seconds. Default is 0.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.inputs = '0'*16
+        self.outputs = ['0']*16
+        self.commands = []
+        self.requests = 0
+        self._server = _ThreadingHTTPServer(('127.0.0.1', 0), _NetiomHandler)
+        self._server.card = self
+        self._thread = None
+        self._connections = set()
+
+    @property
+    def url(self):
+        """The address of the server."""
+        return 'http://127.0.0.1:{0}/'.format(self._server.server_address[1])
+
+    def start(self):
+        """
+        Start serving requests in a background thread.
+        """
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,))
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stop the server.
+        """
+        self._server.shutdown()
+        self._server.server_close()
+        # Drop the connections which are being kept alive
+        for connection in list(self._connections):
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except socket.error:
+                pass
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def command(self, command):
+        """
+        Apply a command to the output pins.
+        """
+        self.commands.append(command)
+        pin = int(command[1:3]) - 1
+        if command[0] == 'A':
+            self.outputs[pin] = '1'
+        elif command[0] == 'B':
+            self.outputs[pin] = '0'
+
+    def respond(self, page, query):
+        """
+        Return the body of a page, or None if the card does not serve it.
+        """
+        self.requests += 1
+        if page == '':
+            for command in query.split(COMMAND_SEPARATOR) if query else []:
+                self.command(command)
+            return ''
+        elif page == 'digitalinputs.cgi':
+            return self.inputs + '\r\n'
+        elif page == 'digitaloutputs.cgi':
+            outputs = ''.join(self.outputs)
+            return outputs[:8] + '\r\n' + outputs[8:] + '\r\n'
+        return None
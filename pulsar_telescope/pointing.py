@@ -0,0 +1,225 @@
+"""
+Pointing tables for the telescope drive.
+
+Tracking a source needs its hour angle on every tick of the drive loop,
+and planning an observation needs it over a whole night. Rather than
+setting the observatory date and computing the sidereal time and the
+position of the source with ephem each time, the hour angle is
+computed once on a grid of times covering a night, and later times are
+found by interpolating the table. The sidereal time and the hour angle
+are stored unwrapped, so they can be interpolated linearly, and are
+wrapped into range when they are looked up.
+
+Times are ephem dates, in days, throughout. A night is taken to run
+from noon UT to noon UT, which is a whole ephem day.
+"""
+
+import copy, math
+from collections import OrderedDict
+
+import ephem
+import numpy as np
+
+# The spacing of the grid of a table, in days.
+STEP = 1.0/1440
+
+# The number of tables kept by `table_for`.
+MAX_TABLES = 32
+
+_tables = OrderedDict()
+
+
+def _wrap(degrees):
+    # Wrap angles in degrees into [-180, 180)
+    return (np.asarray(degrees) + 180.0) % 360.0 - 180.0
+
+
+class PointingTable(object):
+    """
+    The sidereal time and the hour angle of a source from an observatory
+    at regular times.
+
+    Parameters
+    ----------
+    source : ephem.Body or angle
+       The source, or a fixed right ascension in hours, as an
+       `ephem.hours` or a string or float which it accepts.
+    observatory : ephem.Observer
+       The observatory. It is copied, so its date is left unchanged.
+    start : float
+       The ephem date of the start of the table.
+    end : float
+       The ephem date of the end of the table.
+    east_stop : float, optional
+       The most easterly hour angle the drive can reach, in degrees.
+       Default is -110.
+    west_stop : float, optional
+       The most westerly hour angle the drive can reach, in degrees.
+       Default is 110.
+    step : float, optional
+       The spacing of the table, in days. Default is one minute.
+    """
+
+    def __init__(self, source, observatory, start, end, east_stop=-110, west_stop=110, step=STEP):
+        self.source = source
+        self.east_stop = east_stop
+        self.west_stop = west_stop
+        self.step = step
+        self.dates = np.arange(float(start), float(end) + step, step)
+        observatory = copy.copy(observatory)
+        lst = np.empty(len(self.dates))
+        ra = np.empty(len(self.dates))
+        body = isinstance(source, ephem.Body)
+        if body:
+            source = source.copy()
+        else:
+            ra[:] = ephem.hours(source)
+        for i, date in enumerate(self.dates):
+            observatory.date = date
+            lst[i] = observatory.sidereal_time()
+            if body:
+                source.compute(observatory)
+                ra[i] = source.ra
+        self.lst = np.degrees(np.unwrap(lst))
+        self.ra = np.degrees(np.unwrap(ra))
+        self.hour_angles = self.lst - self.ra
+        # Start the hour angles in [-180, 180), so that they only need
+        # wrapping again after the source transits the antimeridian.
+        self.hour_angles -= self.hour_angles[0] - _wrap(self.hour_angles[0])
+
+    def __repr__(self):
+        return "<PointingTable: {0} from {1} to {2}>".format(
+            getattr(self.source, 'name', self.source), ephem.Date(self.start), ephem.Date(self.end))
+
+    @property
+    def start(self):
+        """The ephem date of the first entry."""
+        return self.dates[0]
+
+    @property
+    def end(self):
+        """The ephem date of the last entry."""
+        return self.dates[-1]
+
+    def covers(self, date):
+        """
+        Return True if every date in `date` is within the table.
+        """
+        date = np.asarray(date, dtype=np.float64)
+        return bool(np.all((date >= self.start) & (date <= self.end)))
+
+    def _interp(self, column, date):
+        if date is None:
+            date = ephem.now()
+        date = np.asarray(date, dtype=np.float64)
+        if not self.covers(date):
+            raise ValueError("The date {0} is outside the pointing table.".format(ephem.Date(np.min(date))))
+        # Interpolate by grid index, so the times keep their precision
+        index = (date - self.start)/self.step
+        return np.interp(index, np.arange(len(self.dates)), column)
+
+    def sidereal_time(self, date=None):
+        """
+        Return the local sidereal time at `date`, in degrees between 0
+        and 360. By default the current time is used.
+        """
+        return self._interp(self.lst, date) % 360.0
+
+    def hour_angle(self, date=None):
+        """
+        Return the hour angle of the source at `date`, in degrees
+        between -180 and 180. By default the current time is used.
+        """
+        return _wrap(self._interp(self.hour_angles, date))
+
+    def visible(self, date=None):
+        """
+        Return True where the hour angle of the source at `date` is
+        between the drive stops. By default the current time is used.
+        """
+        hh = self.hour_angle(date)
+        return (self.east_stop < hh) & (hh < self.west_stop)
+
+    def windows(self):
+        """
+        Find the times when the source is between the drive stops.
+
+        Returns
+        -------
+        numpy.ndarray
+           The ephem dates at which each window opens and closes, with
+           one row per window. Windows which are open at the start or
+           end of the table are cut short there.
+        """
+        hh = _wrap(self.hour_angles)
+        inside = (self.east_stop < hh) & (hh < self.west_stop)
+        changes = np.flatnonzero(np.diff(inside.astype(np.int8)))
+        edges = np.empty(len(changes))
+        for i, j in enumerate(changes):
+            # The crossing of whichever stop lies between the entries
+            a, b = hh[j], hh[j+1]
+            if abs(b - a) > 180:
+                # The hour angle wrapped, so the source is far from the stops
+                edges[i] = self.dates[j+1]
+                continue
+            stop = self.east_stop if min(a, b) <= self.east_stop < max(a, b) else self.west_stop
+            edges[i] = self.dates[j] + self.step*(stop - a)/(b - a)
+        if inside[0]:
+            edges = np.append(self.start, edges)
+        if inside[-1]:
+            edges = np.append(edges, self.end)
+        return edges.reshape(-1, 2)
+
+
+def night_of(date):
+    """
+    Return the ephem dates of the noon UT before and after `date`.
+    """
+    start = math.floor(float(date))
+    return start, start + 1.0
+
+
+def _key(source, observatory, night, east_stop, west_stop):
+    if isinstance(source, ephem.Body):
+        source = (type(source).__name__, source.name, getattr(source, '_ra', None),
+                  getattr(source, '_dec', None))
+    else:
+        source = float(ephem.hours(source))
+    return (source, float(observatory.lon), float(observatory.lat), observatory.elevation,
+            night, east_stop, west_stop)
+
+
+def table_for(source, observatory, date=None, east_stop=-110, west_stop=110):
+    """
+    Return the pointing table of a source for the night containing
+    `date`, computing it if it has not been used recently.
+
+    Parameters
+    ----------
+    source : ephem.Body or angle
+       The source, or a fixed right ascension.
+    observatory : ephem.Observer
+       The observatory.
+    date : float, optional
+       An ephem date in the night. By default the current time is used.
+    east_stop, west_stop : float, optional
+       The drive stops, in degrees of hour angle.
+    """
+    if date is None:
+        date = ephem.now()
+    start, end = night_of(date)
+    key = _key(source, observatory, start, east_stop, west_stop)
+    table = _tables.pop(key, None)
+    if table is None:
+        table = PointingTable(source, observatory, start, end, east_stop, west_stop)
+    _tables[key] = table
+    while len(_tables) > MAX_TABLES:
+        _tables.popitem(last=False)
+    return table
+
+
+def clear_tables():
+    """
+    Forget every table made by `table_for`.
+    """
+    _tables.clear()
@@ -0,0 +1,148 @@
+"""
+A log of the positions read from the telescope's encoder.
+
+Every reading of the encoder by a `Drive` is stored in a `PositionLog`
+with its time, its raw Gray code, the encoder position in degrees and
+the hour angle it corresponds to, so that the tracking error and drift
+over a night can be found later without polling the hardware again, or
+compared with a `TimeSeries`.
+
+The log is a ring buffer of fixed size, held as one NumPy array per
+column. Each reading is written twice, once in each half of the arrays,
+so that the most recent readings are always contiguous in memory and
+can be returned as views, in order, without copying.
+"""
+
+import numpy as np
+from astropy.time import Time
+
+# The columns of the log, and their types
+COLUMNS = (('time', np.float64),
+           ('gray', np.uint32),
+           ('degrees', np.float64),
+           ('hour_angle', np.float64))
+
+
+class PositionLog(object):
+    """
+    A ring buffer of encoder readings.
+
+    Parameters
+    ----------
+    capacity : int, optional
+       The number of readings to keep. Once the log is full each new
+       reading replaces the oldest. Default is 86400, a day of readings
+       at one a second.
+    """
+
+    def __init__(self, capacity=86400):
+        self.capacity = int(capacity)
+        self._columns = dict((name, np.zeros(2*self.capacity, dtype=dtype)) for name, dtype in COLUMNS)
+        self._next = 0
+        self._count = 0
+        # The number of readings ever added, including those overwritten
+        self.total = 0
+
+    def __len__(self):
+        return self._count
+
+    def __repr__(self):
+        return "<PositionLog: {0} of {1} readings>".format(self._count, self.capacity)
+
+    def append(self, timestamp, gray, degrees, hour_angle):
+        """
+        Add a reading to the log.
+
+        Parameters
+        ----------
+        timestamp : float
+           The unix time of the reading.
+        gray : int
+           The Gray code reported by the encoder.
+        degrees : float
+           The encoder position, in degrees.
+        hour_angle : float
+           The hour angle the telescope was pointing at, in degrees.
+        """
+        i, j = self._next, self._next + self.capacity
+        columns = self._columns
+        columns['time'][i] = columns['time'][j] = timestamp
+        columns['gray'][i] = columns['gray'][j] = gray
+        columns['degrees'][i] = columns['degrees'][j] = degrees
+        columns['hour_angle'][i] = columns['hour_angle'][j] = hour_angle
+        self._next = (i + 1) % self.capacity
+        if self._count < self.capacity:
+            self._count += 1
+        self.total += 1
+
+    def clear(self):
+        """
+        Remove every reading from the log.
+        """
+        self._next = 0
+        self._count = 0
+
+    def column(self, name, last=None):
+        """
+        Return a read-only view of one column of the log, oldest reading
+        first.
+
+        Parameters
+        ----------
+        name : str
+           One of 'time', 'gray', 'degrees' or 'hour_angle'.
+        last : int, optional
+           Only return the most recent `last` readings. By default every
+           reading in the log is returned.
+        """
+        count = self._count if last is None else min(int(last), self._count)
+        end = self._next + self.capacity
+        view = self._columns[name][end-count:end]
+        view.flags.writeable = False
+        return view
+
+    def times(self, last=None):
+        """The unix time of each reading."""
+        return self.column('time', last)
+
+    def grays(self, last=None):
+        """The raw Gray code of each reading."""
+        return self.column('gray', last)
+
+    def degrees(self, last=None):
+        """The encoder position of each reading, in degrees."""
+        return self.column('degrees', last)
+
+    def hour_angles(self, last=None):
+        """The hour angle of each reading, in degrees."""
+        return self.column('hour_angle', last)
+
+    def gps(self, last=None):
+        """
+        Return the GPS time of each reading, to compare with the times
+        of a `TimeSeries`.
+        """
+        times = self.times(last)
+        return Time(times, format='unix').gps if len(times) else np.zeros(0)
+
+    def since(self, timestamp):
+        """
+        Return the number of readings made at or after a unix time, to
+        use as `last`.
+        """
+        return self._count - int(np.searchsorted(self.times(), timestamp, side='left'))
+
+    def at(self, gps, name='hour_angle'):
+        """
+        Interpolate a column of the log at GPS times, such as the sample
+        times of a `TimeSeries`. Times outside the log take the value of
+        the nearest reading.
+
+        Raises
+        ------
+        ValueError
+           If the log is empty.
+        """
+        if not self._count:
+            raise ValueError("The position log is empty.")
+        return np.interp(gps, self.gps(), self.column(name))
@@ -0,0 +1,267 @@
+"""
+Scheduling of observations with the telescope.
+
+A plan is made for a set of targets, each with a priority and a minimum
+time to observe it for once the telescope has been slewed to it. The
+plan covers a stretch of time divided into short slots. In each slot the
+telescope is either tracking a target, slewing between targets, or
+parked. The value of a plan is the time spent on each target while it
+is between the drive stops, weighted by the target's priority, less a
+small penalty for each slew. The plan with the greatest value is found
+by dynamic programming over the slots, working back from the end.
+
+The hour angles of the targets are taken from the pointing tables, so
+once the tables for a night have been made a new plan can be made in a
+few milliseconds, such as when a target becomes unavailable part way
+through the night.
+"""
+
+import collections
+
+import ephem
+import numpy as np
+
+from . import pointing
+
+# One entry of a timeline. `kind` is 'observe', 'slew' or 'idle', and
+# `target` is the target being observed or slewed to, or None.
+Block = collections.namedtuple('Block', ['start', 'end', 'kind', 'target'])
+
+
+class Target(object):
+    """
+    A source to be observed.
+
+    Parameters
+    ----------
+    source : ephem.Body or angle
+       The source, or a fixed right ascension.
+    priority : float, optional
+       The value of each second spent observing the source, relative to
+       the other targets. Default is 1.
+    dwell : float, optional
+       The shortest time to observe the source for after slewing to it,
+       in seconds. Default is 1800.
+    name : str, optional
+       The name of the target. By default the name of the source.
+    """
+
+    def __init__(self, source, priority=1.0, dwell=1800.0, name=None):
+        self.source = source
+        self.priority = float(priority)
+        self.dwell = float(dwell)
+        if name is None:
+            name = getattr(source, 'name', str(source))
+        self.name = name
+
+    def __repr__(self):
+        return "<Target: {0}, priority {1}, dwell {2} s>".format(self.name, self.priority, self.dwell)
+
+
+class Scheduler(object):
+    """
+    Plans observations of a set of targets from an observatory.
+
+    Parameters
+    ----------
+    targets : list of Target
+       The targets to observe.
+    observatory : ephem.Observer
+       The observatory.
+    east_stop : float, optional
+       The most easterly hour angle the drive can reach, in degrees.
+       Default is -110.
+    west_stop : float, optional
+       The most westerly hour angle the drive can reach, in degrees.
+       Default is 110.
+    slew_rate : float, optional
+       The speed the drive slews at, in degrees of hour angle per
+       second. Default is 0.25.
+    slot : float, optional
+       The length of each slot of the plan, in seconds. Default is 300.
+    slew_penalty : float, optional
+       The value lost by each slew, in seconds of observing at a
+       priority of 1, which keeps the plan from switching targets when
+       there is nothing to gain by it. Default is 60.
+    """
+
+    def __init__(self, targets, observatory, east_stop=-110, west_stop=110,
+                 slew_rate=0.25, slot=300.0, slew_penalty=60.0):
+        self.targets = list(targets)
+        self.observatory = observatory
+        self.east_stop = east_stop
+        self.west_stop = west_stop
+        self.slew_rate = float(slew_rate)
+        self.slot = float(slot)
+        self.slew_penalty = float(slew_penalty)
+
+    def hour_angles(self, target, dates):
+        """
+        Return the hour angle of a target at each of `dates`, from the
+        pointing table of each night they fall in.
+        """
+        dates = np.asarray(dates, dtype=np.float64)
+        hh = np.empty(len(dates))
+        nights = np.floor(dates)
+        for night in np.unique(nights):
+            here = nights == night
+            table = pointing.table_for(target.source, self.observatory, night,
+                                       self.east_stop, self.west_stop)
+            hh[here] = table.hour_angle(dates[here])
+        return hh
+
+    def windows(self, target, start, end):
+        """
+        Return the times between `start` and `end` when a target is
+        between the drive stops, as ephem dates with one row per window.
+        """
+        windows = []
+        for night in np.arange(np.floor(start), np.floor(end) + 1):
+            table = pointing.table_for(target.source, self.observatory, night,
+                                       self.east_stop, self.west_stop)
+            for opens, closes in table.windows():
+                opens, closes = max(opens, start), min(closes, end)
+                if opens >= closes:
+                    continue
+                if windows and opens - windows[-1][1] < table.step:
+                    # Join windows which continue across a night
+                    windows[-1][1] = closes
+                else:
+                    windows.append([opens, closes])
+        return np.array(windows).reshape(-1, 2)
+
+    def plan(self, start=None, end=None, position=0.0, exclude=()):
+        """
+        Plan observations between two times.
+
+        Parameters
+        ----------
+        start : float, optional
+           The ephem date to start the plan. By default, now.
+        end : float, optional
+           The ephem date to end the plan. By default, a day after the
+           start.
+        position : float, optional
+           The hour angle the telescope is pointing at when the plan
+           starts, in degrees. Default is 0, the parked position.
+        exclude : iterable, optional
+           Targets, or the names of targets, to leave out of the plan,
+           such as those which have become unavailable.
+
+        Returns
+        -------
+        list of Block
+           The timeline, in order, with consecutive slots of the same
+           kind on the same target joined into one block.
+        """
+        if start is None:
+            start = ephem.now()
+        start = float(start)
+        if end is None:
+            end = start + 1.0
+        end = float(end)
+        exclude = set(exclude)
+        targets = [target for target in self.targets
+                   if target not in exclude and target.name not in exclude]
+        step = self.slot/86400.0
+        nslots = max(int(np.ceil((end - start)/step)), 1)
+        edges = start + step*np.arange(nslots + 1)
+        edges[-1] = min(edges[-1], end)
+        mids = 0.5*(edges[:-1] + edges[1:])
+        lengths = np.diff(edges)*86400.0
+
+        # The hour angle of each target in each slot, followed by the
+        # park position on the meridian, and the position the telescope
+        # starts from, which can be left but not returned to.
+        ntargets = len(targets)
+        park, origin = ntargets, ntargets + 1
+        nstates = ntargets + 2
+        hh = np.empty((nstates, nslots))
+        for j, target in enumerate(targets):
+            hh[j] = self.hour_angles(target, mids)
+        hh[park] = 0.0
+        hh[origin] = position
+        visible = (self.east_stop < hh) & (hh < self.west_stop)
+        visible[park:] = False
+
+        # The value of observing each target in each slot, and its
+        # running total so a run of slots can be valued at once.
+        priority = np.array([target.priority for target in targets] + [0.0, 0.0])
+        gain = np.where(visible, priority[:, None]*lengths, 0.0)
+        totals = np.zeros((nstates, nslots + 1))
+        np.cumsum(gain, axis=1, out=totals[:, 1:])
+        ok = np.zeros((nstates, nslots + 1), dtype=np.int64)
+        np.cumsum(visible, axis=1, out=ok[:, 1:])
+        dwell = np.array([int(np.ceil(target.dwell/self.slot)) for target in targets] + [1, 1])
+        dwell = np.maximum(dwell, 1)
+
+        # value[s, j] is the most value that can be had from slot s on,
+        # with the telescope on target j at the start of slot s.
+        value = np.zeros((nslots + 1, nstates))
+        choice = np.zeros((nslots, nstates), dtype=np.int64)
+        arrive = np.zeros((nslots, nstates), dtype=np.int64)
+        columns = np.arange(nstates)
+        rows = columns[None, :]
+        for s in range(nslots - 1, -1, -1):
+            # Stay on the current target
+            best = gain[:, s] + value[s+1]
+            best_choice = columns.copy()
+            best_arrive = np.full(nstates, s + 1)
+            # Slew from target j to target k, then observe k for at least
+            # its dwell time
+            slews = np.ceil(np.abs(hh[:, s, None] - hh[None, :, s])/self.slew_rate/self.slot).astype(np.int64)
+            observe = s + slews
+            finish = observe + dwell[None, :]
+            possible = finish <= nslots
+            observe, finish = np.minimum(observe, nslots), np.minimum(finish, nslots)
+            # Targets must stay visible for the whole dwell, but the
+            # telescope can be parked at any time.
+            whole = (ok[rows, finish] - ok[rows, observe]) == (finish - observe)
+            whole[:, park] = True
+            possible &= whole
+            switch = totals[rows, finish] - totals[rows, observe] + value[finish, rows] \
+                - self.slew_penalty*(slews > 0)
+            switch[~possible] = -np.inf
+            switch[:, origin] = -np.inf
+            np.fill_diagonal(switch, -np.inf)
+            k = np.argmax(switch, axis=1)
+            better = switch[columns, k] > best
+            best[better] = switch[columns, k][better]
+            best_choice[better] = k[better]
+            best_arrive[better] = observe[columns, k][better]
+            value[s] = best
+            choice[s] = best_choice
+            arrive[s] = best_arrive
+
+        self.value = value[0, origin]
+        return self._timeline(targets, edges, visible, choice, arrive, dwell)
+
+    def _timeline(self, targets, edges, visible, choice, arrive, dwell):
+        # Follow the choices forward from the parked telescope
+        nslots = len(edges) - 1
+        blocks = []
+
+        def add(first, last, kind, target):
+            if last <= first:
+                return
+            if blocks and blocks[-1].kind == kind and blocks[-1].target is target and blocks[-1].end == edges[first]:
+                blocks[-1] = blocks[-1]._replace(end=edges[last])
+            else:
+                blocks.append(Block(edges[first], edges[last], kind, target))
+
+        j, s = len(targets) + 1, 0
+        while s < nslots:
+            k = choice[s, j]
+            if k == j:
+                target = targets[j] if j < len(targets) else None
+                add(s, s + 1, 'observe' if visible[j, s] else 'idle', target)
+                s += 1
+                continue
+            target = targets[k] if k < len(targets) else None
+            observe = arrive[s, j]
+            add(s, observe, 'slew', target)
+            last = min(observe + dwell[k], nslots)
+            for slot in range(observe, last):
+                add(slot, slot + 1, 'observe' if visible[k, slot] else 'idle', target)
+            j, s = k, last
+        return blocks
@@ -0,0 +1,233 @@
+"""
+Periodicity searches for pulsar time series.
+
+Two searches are provided. `harmonic_spectrum` finds candidate pulse
+frequencies from the power spectrum of a time series, summing the power
+in each frequency's harmonics since pulsar profiles are narrow.
+`fold_search` refines a frequency by epoch folding over a grid of
+trial frequencies and frequency derivatives.
+
+Rather than folding the whole time series again for every trial, the
+fold search folds it once into a set of sub-integrations at a reference
+frequency. A trial frequency and derivative only change the phase by a
+small amount over each sub-integration, so the profile of a trial is
+found by shifting each sub-integration's profile by the phase drift of
+the trial, and summing them.
+"""
+
+import multiprocessing, os, shutil, tempfile
+
+import numpy as np
+
+# The largest number of elements to gather at once when shifting
+# sub-integration profiles.
+_GATHER_ELEMENTS = 1 << 22
+
+
+def harmonic_spectrum(data, samp_rate, nharm=4):
+    """
+    Calculate the harmonically summed power spectrum of a time series.
+
+    Parameters
+    ----------
+    data : numpy.ndarray
+       The samples, evenly spaced in time.
+    samp_rate : float
+       The sample rate, in samples per second.
+    nharm : int, optional
+       The number of harmonics to sum, including the fundamental.
+       Default is 4.
+
+    Returns
+    -------
+    frequencies : numpy.ndarray
+       The frequency of each bin of the spectrum, in Hz.
+    power : numpy.ndarray
+       The power at each frequency summed with the power at its first
+       `nharm`-1 harmonics, normalised by the median power.
+    """
+    data = np.nan_to_num(np.asarray(data, dtype=np.float64) - np.nanmean(data))
+    power = np.abs(np.fft.rfft(data))**2
+    power[0] = 0
+    power /= np.median(power[1:]) if len(power) > 1 else 1
+    frequencies = np.fft.rfftfreq(len(data), 1.0/samp_rate)
+    n = len(power)//nharm
+    summed = power[:n].copy()
+    for harmonic in range(2, nharm + 1):
+        summed += power[:n*harmonic:harmonic]
+    return frequencies[:n], summed
+
+
+def _subint_sums(data, times, frequency, nbins, nsub, start, span):
+    # Fold samples into the sub-integrations of a time series starting
+    # at `start` and lasting `span` seconds, returning sums which can be
+    # added to those of other blocks of the same time series.
+    data = np.asarray(data, dtype=np.float64)
+    good = np.isfinite(data)
+    data, times = data[good], np.asarray(times)[good]
+    sub = np.clip(((times - start)*(nsub/float(span or 1))).astype(np.int64), 0, nsub - 1)
+    phase = times*frequency
+    phase -= np.floor(phase)
+    index = sub*nbins + np.minimum((phase*nbins).astype(np.int64), nbins - 1)
+    size = nsub*nbins
+    profiles = np.bincount(index, weights=data, minlength=size).reshape(nsub, nbins)
+    counts = np.bincount(index, minlength=size).reshape(nsub, nbins)
+    time_sums = np.bincount(sub, weights=times, minlength=nsub)
+    return profiles, counts, time_sums, np.dot(data, data)
+
+
+def _mid_times(counts, time_sums):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.nan_to_num(time_sums/counts.sum(axis=1))
+
+
+def subint_fold(data, times, frequency, nbins, nsub):
+    """
+    Fold a time series into sub-integrations at a fixed frequency.
+
+    Parameters
+    ----------
+    data : numpy.ndarray
+       The samples. NaN samples are ignored.
+    times : numpy.ndarray
+       The time of each sample, in seconds from the reference epoch.
+    frequency : float
+       The folding frequency, in Hz.
+    nbins : int
+       The number of phase bins.
+    nsub : int
+       The number of sub-integrations, which are equal in duration.
+
+    Returns
+    -------
+    profiles : numpy.ndarray
+       The sum of the samples in each sub-integration and phase bin.
+    counts : numpy.ndarray
+       The number of samples in each sub-integration and phase bin.
+    mid_times : numpy.ndarray
+       The mean time of the samples in each sub-integration.
+    """
+    profiles, counts, time_sums, _ = _subint_sums(data, times, frequency, nbins, nsub,
+                                                  times[0], times[-1] - times[0])
+    return profiles, counts, _mid_times(counts, time_sums)
+
+
+def _score(profiles, counts, mid_times, reference, trials, fdot, mean, var):
+    # The chi-squared of the profile of each trial frequency at one
+    # frequency derivative.
+    nsub, nbins = profiles.shape
+    bins = np.arange(nbins)
+    rows = np.arange(nsub)[None, :, None]
+    chunk = max(1, _GATHER_ELEMENTS//(nsub*nbins))
+    chi2 = np.empty(len(trials))
+    for first in range(0, len(trials), chunk):
+        block = trials[first:first+chunk]
+        # The extra phase of each trial over the reference fold, at
+        # the middle of each sub-integration, in bins.
+        drift = (block[:, None] - reference)*mid_times + 0.5*fdot*mid_times**2
+        shifts = np.round(drift*nbins).astype(np.int64)
+        index = (bins[None, None, :] - shifts[:, :, None]) % nbins
+        summed = profiles[rows, index].sum(axis=1)
+        count = counts[rows, index].sum(axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            terms = (summed - count*mean)**2/(count*var)
+        chi2[first:first+chunk] = np.nansum(terms, axis=1)
+    return chi2
+
+
+def _share(array, directory, name):
+    # Write an array to a file which worker processes can memory-map,
+    # rather than pickling it to each of them.
+    path = os.path.join(directory, name + '.npy')
+    np.save(path, array)
+    return path
+
+
+def _fold_block(args):
+    data_path, times_path, first, last, frequency, nbins, nsub, start, span = args
+    data = np.load(data_path, mmap_mode='r')[first:last]
+    times = np.load(times_path, mmap_mode='r')[first:last]
+    return _subint_sums(data, times, frequency, nbins, nsub, start, span)
+
+
+def _score_trials(args):
+    return _score(*args)
+
+
+def fold_search(data, times, frequencies, fdots=(0.0,), nbins=32, nsub=64, workers=1):
+    """
+    Search for the pulse frequency and frequency derivative which give
+    the most significant folded profile.
+
+    Parameters
+    ----------
+    data : numpy.ndarray
+       The samples. NaN samples are ignored.
+    times : numpy.ndarray
+       The time of each sample, in seconds from the reference epoch at
+       which the trial frequencies apply.
+    frequencies : array-like
+       The trial frequencies, in Hz. These should be close enough
+       together that the phase drifts by much less than one bin per
+       sub-integration between neighbouring trials.
+    fdots : array-like, optional
+       The trial frequency derivatives, in Hz per second. By default
+       only zero is tried.
+    nbins : int, optional
+       The number of phase bins in the profile. Default is 32.
+    nsub : int, optional
+       The number of sub-integrations. Default is 64.
+    workers : int, optional
+       The number of processes to use. With more than one, the time
+       series is written to temporary files which each process maps
+       into memory, each process folds a block of it, and the trials
+       are divided between the processes. Default is 1.
+
+    Returns
+    -------
+    periodogram : numpy.ndarray
+       The chi-squared of the folded profile against a flat profile, for
+       each trial frequency derivative (rows) and frequency (columns).
+    best : tuple
+       The frequency, frequency derivative and chi-squared of the most
+       significant trial.
+    """
+    frequencies = np.atleast_1d(np.asarray(frequencies, dtype=np.float64))
+    fdots = np.atleast_1d(np.asarray(fdots, dtype=np.float64))
+    reference = frequencies[len(frequencies)//2]
+    start, span = times[0], times[-1] - times[0]
+
+    if workers > 1:
+        directory = tempfile.mkdtemp(prefix='pulsar_search')
+        pool = multiprocessing.Pool(workers)
+        try:
+            data_path = _share(data, directory, 'data')
+            times_path = _share(times, directory, 'times')
+            edges = np.linspace(0, len(data), workers + 1).astype(np.int64)
+            blocks = [(data_path, times_path, edges[i], edges[i+1], reference, nbins, nsub, start, span)
+                      for i in range(workers)]
+            sums = pool.map(_fold_block, blocks)
+            profiles, counts, time_sums, squares = [sum(parts) for parts in zip(*sums)]
+            mid_times = _mid_times(counts, time_sums)
+            n = counts.sum()
+            mean = profiles.sum()/n
+            var = squares/n - mean**2
+            tasks = [(profiles, counts, mid_times, reference, trials, fdot, mean, var)
+                     for fdot in fdots for trials in np.array_split(frequencies, workers)]
+            scores = pool.map(_score_trials, tasks)
+        finally:
+            pool.close()
+            pool.join()
+            shutil.rmtree(directory, ignore_errors=True)
+        periodogram = np.concatenate(scores).reshape(len(fdots), len(frequencies))
+    else:
+        profiles, counts, time_sums, squares = _subint_sums(data, times, reference, nbins, nsub, start, span)
+        mid_times = _mid_times(counts, time_sums)
+        n = counts.sum()
+        mean = profiles.sum()/n
+        var = squares/n - mean**2
+        periodogram = np.array([_score(profiles, counts, mid_times, reference, frequencies, fdot, mean, var)
+                                for fdot in fdots])
+
+    i, j = np.unravel_index(np.argmax(periodogram), periodogram.shape)
+    return periodogram, (frequencies[j], fdots[i], periodogram[i, j])
@@ -0,0 +1,182 @@
+"""
+Time axes for pulsar telescope captures.
+
+A capture is sampled at a fixed rate, but the receiver can drop samples
+when it overruns, after which the samples restart at a new timestamp.
+Rather than storing a time for every sample, the time axis is stored as
+the first sample and GPS start time of each contiguous segment, and the
+times of individual samples are calculated when they are needed.
+"""
+
+import numpy as np
+from astropy.time import Time
+
+# One record per overrun gap in a time axis.
+GAP_DTYPE = np.dtype([('start_sample', np.int64),
+                      ('gps_time', np.float64),
+                      ('missing', np.float64)])
+
+
+class TimeAxis(object):
+    """
+    The sample times of a capture made up of one or more contiguous
+    segments sampled at the same rate.
+
+    Parameters
+    ----------
+    firsts : array-like
+       The index of the first sample in each segment. The first entry
+       must be 0.
+    starts : array-like
+       The GPS time of the first sample in each segment.
+    samp_rate : float
+       The sample rate, in samples per second.
+    length : int
+       The total number of samples.
+    """
+
+    def __init__(self, firsts, starts, samp_rate, length):
+        self.firsts = np.atleast_1d(np.asarray(firsts, dtype=np.int64))
+        self.starts = np.atleast_1d(np.asarray(starts, dtype=np.float64))
+        self.samp_rate = np.float64(samp_rate)
+        self.length = int(length)
+        # Segment start times relative to the first sample, which keeps
+        # sub-sample precision that is lost in an absolute GPS time.
+        self._offsets = self.starts - self.starts[0]
+
+    def __len__(self):
+        return self.length
+
+    def __repr__(self):
+        return "<TimeAxis: {0} samples at {1} Hz from GPS {2} in {3} segments>".format(
+            self.length, self.samp_rate, self.start, len(self.firsts))
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            first, last, step = key.indices(self.length)
+            if step == 1:
+                return self.start + self._fill(first, last)
+            return self.gps(np.arange(first, last, step))
+        return self.gps(key)
+
+    @property
+    def start(self):
+        """The GPS time of the first sample."""
+        return self.starts[0]
+
+    @property
+    def duration(self):
+        """The time between the first sample and the end of the last one."""
+        return self.relative(self.length - 1) + 1.0/self.samp_rate if self.length else 0.0
+
+    @property
+    def gaps(self):
+        """
+        The overruns in the time axis, as a structured array with one
+        record per gap giving the first sample after the gap, its GPS
+        time, and the length of the gap in seconds.
+        """
+        gaps = np.zeros(len(self.firsts) - 1, dtype=GAP_DTYPE)
+        gaps['start_sample'] = self.firsts[1:]
+        gaps['gps_time'] = self.starts[1:]
+        ends = self._offsets[:-1] + np.diff(self.firsts)/self.samp_rate
+        gaps['missing'] = self._offsets[1:] - ends
+        return gaps
+
+    def segments(self):
+        """
+        Return the first sample, one past the last sample, and the GPS
+        start time of each contiguous segment.
+        """
+        lasts = np.append(self.firsts[1:], self.length)
+        return list(zip(self.firsts, lasts, self.starts))
+
+    def _fill(self, first, last, out=None):
+        # Relative times of a contiguous range of samples, filled one
+        # segment at a time into a single preallocated array.
+        if out is None:
+            out = np.empty(max(last - first, 0), dtype=np.float64)
+        lasts = np.append(self.firsts[1:], self.length)
+        for seg in range(self.segment_of(first), len(self.firsts)):
+            lo, hi = max(self.firsts[seg], first), min(lasts[seg], last)
+            if lo >= hi:
+                break
+            view = out[lo-first:hi-first]
+            view[:] = np.arange(lo - self.firsts[seg], hi - self.firsts[seg])
+            view /= self.samp_rate
+            view += self._offsets[seg]
+        return out
+
+    def segment_of(self, samples):
+        """
+        Return the index of the segment each of `samples` belongs to.
+        """
+        return np.searchsorted(self.firsts, samples, side='right') - 1
+
+    def relative(self, samples=None, out=None):
+        """
+        Calculate the time in seconds of samples since the first sample.
+
+        Parameters
+        ----------
+        samples : int or array-like, optional
+           The sample indices. By default the times of every sample are
+           returned.
+        out : numpy.ndarray, optional
+           An array to write the times of every sample into, when
+           `samples` is not given.
+        """
+        if samples is None:
+            return self._fill(0, self.length, out)
+        samples = np.asarray(samples)
+        seg = self.segment_of(samples)
+        return self._offsets[seg] + (samples - self.firsts[seg])/self.samp_rate
+
+    def gps(self, samples=None, out=None):
+        """
+        Calculate the GPS time of samples.
+
+        Parameters
+        ----------
+        samples : int or array-like, optional
+           The sample indices. By default the times of every sample are
+           returned.
+        out : numpy.ndarray, optional
+           An array to write the times of every sample into, when
+           `samples` is not given.
+        """
+        if samples is None:
+            out = self._fill(0, self.length, out)
+            out += self.start
+            return out
+        return self.start + self.relative(samples)
+
+    def to_time(self, samples=None):
+        """
+        Return the times of samples as an astropy `Time` object.
+        """
+        return Time(self.gps(samples), format='gps', scale='tai')
+
+    def sample_at(self, gps):
+        """
+        Return the index of the sample nearest to each GPS time in `gps`.
+        Times falling in a gap are assigned to the following segment.
+        """
+        rel = np.asarray(gps, dtype=np.float64) - self.start
+        seg = np.clip(np.searchsorted(self._offsets, rel, side='right') - 1, 0, None)
+        samples = self.firsts[seg] + np.round((rel - self._offsets[seg])*self.samp_rate).astype(np.int64)
+        # A time past the end of its segment is in the gap after it
+        lasts = np.append(self.firsts[1:], self.length)
+        samples = np.minimum(samples, lasts[seg])
+        return np.clip(samples, 0, max(self.length - 1, 0))
+
+    def slice(self, first, last):
+        """
+        Return the time axis of samples `first` to `last`.
+        """
+        first, last, _ = slice(first, last).indices(self.length)
+        last = max(first, last)
+        inside = (self.firsts > first) & (self.firsts < last)
+        firsts = np.concatenate(([0], self.firsts[inside] - first))
+        starts = np.concatenate(([self.gps(first)], self.starts[inside]))
+        return TimeAxis(firsts, starts, self.samp_rate, last - first)
@@ -0,0 +1,231 @@
+"""
+Closed-loop tracking of a source with the telescope drive.
+
+`TrackingController` keeps the telescope pointed at a source by running
+a control loop at a fixed rate. On each tick it reads the encoder, finds
+the hour angle of the source from its pointing table, and sets a speed
+made of two parts: a feed-forward term which turns the telescope at the
+rate the hour angle of the source is changing, and a feedback term,
+the same law as `Drive.diff`, which closes the remaining pointing error.
+
+The controller records how late each tick starts (the jitter), how long
+the encoder takes to read, how long a speed takes to write, and the
+time from writing a speed until the encoder first shows the telescope
+moving in its direction, as histograms, so that the rate of the loop
+can be chosen from measured timings.
+
+When the source leaves the drive stops the loop ends without moving the
+telescope, and `left_stops` is set, so the caller can park it.
+"""
+
+import logging, time
+
+import ephem
+import numpy as np
+
+from . import pointing
+
+# The length of a sidereal day, in seconds
+SIDEREAL_DAY = 86164.0905
+
+
+class Histogram(object):
+    """
+    A histogram of timings which is filled one value at a time.
+
+    Parameters
+    ----------
+    edges : array-like, optional
+       The edges of the bins, in seconds. Values outside the edges are
+       counted in the first and last bins. By default there are bins
+       spaced logarithmically from 0.1 ms to 10 s.
+    """
+
+    def __init__(self, edges=None):
+        if edges is None:
+            edges = np.concatenate(([0], np.logspace(-4, 1, 26)))
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self.counts = np.zeros(len(self.edges) - 1, dtype=np.int64)
+        self.total = 0.0
+        self.largest = 0.0
+
+    def __len__(self):
+        return int(self.counts.sum())
+
+    def add(self, value):
+        """
+        Count a value.
+        """
+        i = np.searchsorted(self.edges, value, side='right') - 1
+        self.counts[min(max(i, 0), len(self.counts) - 1)] += 1
+        self.total += value
+        self.largest = max(self.largest, value)
+
+    @property
+    def mean(self):
+        """The mean of the values counted."""
+        return self.total/len(self) if len(self) else np.nan
+
+    def percentile(self, q):
+        """
+        Estimate a percentile of the values, from the upper edge of the
+        bin it falls in.
+        """
+        if not len(self):
+            return np.nan
+        i = np.searchsorted(np.cumsum(self.counts), q/100.0*len(self))
+        return self.edges[min(i + 1, len(self.edges) - 1)]
+
+
+class TrackingController(object):
+    """
+    Tracks a source with the drive at a fixed rate.
+
+    Parameters
+    ----------
+    drive : Drive
+       The drive.
+    source : ephem.Body or angle
+       The source, or a fixed right ascension.
+    rate : float, optional
+       The number of control ticks per second. Default is 1.
+    max_rate : float, optional
+       The rate the telescope turns at full speed, in degrees of hour
+       angle per second, used to convert the feed-forward rate into a
+       speed. Default is 1.
+    exponent : float, optional
+       The exponent of the feedback law, speed = sign*(diff/360)**exponent.
+       Default is 0.25, as used by `Drive.diff`.
+    tolerance : float, optional
+       The pointing error below which no feedback is applied, in
+       degrees. Default is 0.05.
+    observatory : ephem.Observer, optional
+       The observatory. By default the drive's.
+    """
+
+    def __init__(self, drive, source, rate=1.0, max_rate=1.0, exponent=0.25,
+                 tolerance=0.05, observatory=None):
+        self.drive = drive
+        self.source = source
+        self.rate = float(rate)
+        self.max_rate = float(max_rate)
+        self.exponent = exponent
+        self.tolerance = tolerance
+        if observatory is None:
+            observatory = drive.observatory
+        self.observatory = observatory
+        self.logger = logging.getLogger('PT.Tracking')
+        self.jitter = Histogram()
+        self.encoder_latency = Histogram()
+        self.write_latency = Histogram()
+        self.command_latency = Histogram()
+        self.overruns = 0
+        self.left_stops = False
+        self.error = np.nan
+        self.speed = None
+        # The time, position and direction of the command whose effect
+        # has not yet been seen
+        self._commanded = None
+
+    @property
+    def period(self):
+        """The time between ticks, in seconds."""
+        return 1.0/self.rate
+
+    def table(self, date):
+        return pointing.table_for(self.source, self.observatory, date,
+                                  self.drive.east_stop, self.drive.west_stop)
+
+    def target(self, date):
+        """
+        Return the hour angle of the source at an ephem date, and the
+        rate it is changing at in degrees per second.
+        """
+        table = self.table(date)
+        hh = float(table.hour_angle(date))
+        # The rate is taken across one step of the table, inside it
+        dt = table.step/2
+        before, after = max(date - dt, table.start), min(date + dt, table.end)
+        change = float(table.hour_angle(after)) - float(table.hour_angle(before))
+        change = (change + 180.0) % 360.0 - 180.0
+        return hh, change/((after - before)*86400.0)
+
+    def control(self, hh, hh_rate, pos):
+        """
+        Return the pointing error and the speed to drive at, for a target
+        hour angle which changes at `hh_rate` degrees per second and the
+        current position.
+        """
+        diff = hh - pos
+        speed = hh_rate/self.max_rate
+        if abs(diff) > self.tolerance:
+            speed += np.sign(diff)*(abs(diff)/360.0)**self.exponent
+        return diff, float(np.clip(speed, -1.0, 1.0))
+
+    def step(self, date=None):
+        """
+        Run one tick of the loop: read the encoder, and set the speed.
+
+        Returns
+        -------
+        bool
+           False if the source is outside the drive stops, in which case
+           no speed is set and `left_stops` is set.
+        """
+        if date is None:
+            date = ephem.now()
+        hh, hh_rate = self.target(date)
+        started = time.time()
+        pos = self.drive.read_position()
+        finished = time.time()
+        self.encoder_latency.add(finished - started)
+        if self._commanded is not None:
+            commanded, position, direction = self._commanded
+            if direction*(pos - position) > 0:
+                self.command_latency.add(finished - commanded)
+                self._commanded = None
+        if not self.drive.east_stop < hh < self.drive.west_stop:
+            # Parking takes far longer than a tick, so it is left to the
+            # caller once the loop has ended.
+            self.logger.info("The source has moved out of the observable area.")
+            self.left_stops = True
+            return False
+        self.error, self.speed = self.control(hh, hh_rate, pos)
+        started = time.time()
+        self.drive.set_speed(self.speed)
+        self.write_latency.add(time.time() - started)
+        if self._commanded is None and self.speed:
+            self._commanded = (started, pos, np.sign(self.speed))
+        return True
+
+    def run(self, duration=None, ticks=None):
+        """
+        Track the source at the fixed rate until `duration` seconds have
+        passed, `ticks` ticks have run, or the source leaves the drive
+        stops. The drive is enabled first, and disabled at the end.
+        """
+        self.drive.enable()
+        start = time.time()
+        tick, count = start, 0
+        try:
+            while True:
+                now = time.time()
+                self.jitter.add(max(now - tick, 0.0))
+                if not self.step():
+                    break
+                count += 1
+                if ticks is not None and count >= ticks:
+                    break
+                if duration is not None and now - start >= duration:
+                    break
+                tick += self.period
+                now = time.time()
+                if now > tick:
+                    # Skip the ticks which have already been missed
+                    missed = int((now - tick)/self.period) + 1
+                    self.overruns += missed
+                    tick += missed*self.period
+                time.sleep(tick - now)
+        finally:
+            self.drive.disable()
+        return count
@@ -34,9 +34,6 @@ setup(
     packages=[
         'pulsar_telescope',
     ],
-    package_data={
-        '': ['pulsar_telescope/graycode.txt']
-    },
     package_dir={'pulsar_telescope':
                  'pulsar_telescope'},
     include_package_data=True,
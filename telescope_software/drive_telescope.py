@@ -4,6 +4,7 @@ from __future__ import division, print_function
 import urllib, ephem, time, math
 from visual import *
 import wx
+from pulsar_telescope import pointing
 
 ##bar = EasyDialogs.ProgressBar()
 # for debugging offline
@@ -212,6 +213,8 @@ speed = 0.0
 set_speed(speed)
 enable_drive()
 pos = 0.0
+# the hour angle for the night is looked up in a precomputed table
+table = pointing.table_for(crab, Acre_Road, ephem.now(), east_stop, west_stop)
 
 
 
@@ -228,11 +231,10 @@ while True:
     rate(1)
 
 
-    Acre_Road.date = ephem.now()
-    crab.compute(Acre_Road) # compute its position at present epoch
-    hh = (Acre_Road.sidereal_time() - crab.ra)/math.pi*180.0 # calculate the current hh=lst-ra
-    if hh>180.0: hh = hh-360.0
-    if hh<-180.0: hh = hh+360
+    now = ephem.now()
+    if not table.covers(now):
+        table = pointing.table_for(crab, Acre_Road, now, east_stop, west_stop)
+    hh = float(table.hour_angle(now)) # the current hh=lst-ra, in -180 to 180
 #    hh =0.0   # force the hour angle to a value
     if hh>west_stop: hh=0.0
     if hh<east_stop: hh=0.0
@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_asyncdrive
+----------------------------------
+
+Tests for `pulsar_telescope.asyncdrive` module.
+"""
+
+import asyncio
+import json
+import time
+import unittest
+
+from pulsar_telescope import asyncdrive, drive, netiom
+
+
+class MovingNetiom(netiom.FakeNetiom):
+    """
+    A fake card whose encoder turns at the speed set on the DAC while
+    the servo output (pin 9) is enabled.
+    """
+
+    rate = 50.0
+    command_latency = 0.0
+
+    def __init__(self, latency=0.0):
+        super(MovingNetiom, self).__init__(latency)
+        self.degrees = 0.0
+        self.last = time.time()
+
+    def move(self):
+        now = time.time()
+        if self.outputs[8] == '1':
+            word = sum(2**i for i in range(8) if self.outputs[i] == '0')
+            self.degrees += (1.0 - 2.0*word/255)*self.rate*(now - self.last)
+        self.last = now
+
+    def respond(self, page, query):
+        if page == '':
+            time.sleep(self.command_latency)
+        self.move()
+        if page == 'digitalinputs.cgi':
+            count = int(round(self.degrees*8192/360.0)) % 8192
+            gray = count ^ (count >> 1)
+            self.inputs = ''.join(str((gray >> i) & 1) for i in range(13)) + '000'
+        return super(MovingNetiom, self).respond(page, query)
+
+
+def run(coroutine):
+    return asyncio.new_event_loop().run_until_complete(coroutine)
+
+
+class TestAsyncDrive(unittest.TestCase):
+
+    def setUp(self):
+        self.card = MovingNetiom().start()
+        self.drive = drive.Drive(simulate=1, url=self.card.url)
+        self.drive.switch_simulate(0)
+        self.drive.warmup = 0
+        self.drive.power = lambda state: 0
+
+    def tearDown(self):
+        self.drive.transport.close()
+        self.card.stop()
+
+    def test_slew(self):
+        async def slew():
+            async with asyncdrive.AsyncDrive(self.drive, period=0.01) as dish:
+                position = await dish.slew(10.0, timeout=10)
+                return position, dish.enabled
+        position, enabled = run(slew())
+        self.assertLess(abs(position - 10.0), 0.5)
+        self.assertFalse(enabled)
+        self.assertEqual(self.card.outputs[8], '0')
+
+    def test_concurrent(self):
+        # The encoder is polled while a slow write to the DAC is made
+        self.card.command_latency = 0.1
+
+        async def poll():
+            async with asyncdrive.AsyncDrive(self.drive, period=0.01) as dish:
+                await dish.read_position()
+                dish.set_speed(0.5)
+                await asyncio.sleep(0.05)
+                started = time.time()
+                for _ in range(5):
+                    await dish.read_position()
+                return time.time() - started, dish.speed
+        elapsed, speed = run(poll())
+        self.assertLess(elapsed, 0.5)
+        self.assertIsNone(speed)
+
+    def test_deadline(self):
+        self.card.latency = 0.2
+
+        async def slow():
+            async with asyncdrive.AsyncDrive(self.drive, period=0.01, deadline=0.05) as dish:
+                await asyncio.sleep(0.3)
+                return dish.missed['encoder'], dish.position
+        missed, position = run(slow())
+        self.assertGreater(missed, 0)
+        self.assertIsNone(position)
+
+    def test_write_error(self):
+        # The writer carries on after the transport runs out of retries
+        set_speed = self.drive.set_speed
+        calls = []
+
+        def flaky(v):
+            calls.append(v)
+            if len(calls) == 1:
+                raise IOError("out of retries")
+            return set_speed(v)
+        self.drive.set_speed = flaky
+
+        async def write():
+            async with asyncdrive.AsyncDrive(self.drive, period=0.01) as dish:
+                dish.set_speed(0.5)
+                await asyncio.sleep(0.05)
+                self.assertIsNone(dish.speed)
+                dish.set_speed(-0.5)
+                await asyncio.sleep(0.05)
+                return dish.speed
+        self.assertEqual(run(write()), -0.5)
+        self.assertEqual(calls, [0.5, -0.5])
+
+    def test_not_started(self):
+        dish = asyncdrive.AsyncDrive(self.drive)
+        self.assertRaises(RuntimeError, dish.set_speed, 0.5)
+        self.assertRaises(RuntimeError, run, dish.read_position())
+        dish.encoder.close()
+
+    def test_status(self):
+        async def status():
+            async with asyncdrive.AsyncDrive(self.drive, period=0.01) as dish:
+                await dish.read_position()
+                server = await dish.serve_status()
+                port = server.sockets[0].getsockname()[1]
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+                line = await reader.readline()
+                writer.close()
+                server.close()
+                await server.wait_closed()
+                return json.loads(line.decode('ascii'))
+        self.assertEqual(run(status())['position'], 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
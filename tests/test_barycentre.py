@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_barycentre
+----------------------------------
+
+Tests for `pulsar_telescope.barycentre` module.
+"""
+
+import unittest
+
+import ephem
+import numpy as np
+from astropy.coordinates import SkyCoord
+from astropy.time import Time
+
+from pulsar_telescope import barycentre
+
+CRAB = ephem.Equatorial('05:34:31.94', '+22:00:52.2', epoch='2000')
+START = 1117000000.0
+
+
+class TestDelays(unittest.TestCase):
+
+    def test_roemer(self):
+        gps = START + np.array([0.0, 4000.0])
+        time = Time(gps, format='gps', scale='tai', location=barycentre.ACRE_ROAD)
+        ltt = time.light_travel_time(SkyCoord('05h34m31.94s', '+22d00m52.2s'), kind='barycentric').sec
+        tdb, tt = time.tdb, time.tt
+        einstein = ((tdb.jd1 - tt.jd1) + (tdb.jd2 - tt.jd2))*86400.0
+        np.testing.assert_allclose(barycentre.delays(gps, CRAB) - einstein, ltt, atol=1e-6)
+
+    def test_velocity(self):
+        # The velocity towards the source is the rate of change of the delay
+        velocity, speed = barycentre.radial_velocity(START, CRAB)
+        rate = (barycentre.delays(START + 0.5, CRAB) - barycentre.delays(START - 0.5, CRAB))*barycentre.C
+        self.assertAlmostEqual(velocity, rate, delta=1.0)
+        self.assertTrue(29000 < speed < 31000)
+
+
+class TestBarycentricCorrection(unittest.TestCase):
+
+    def setUp(self):
+        self.gps = START + np.arange(0, 3*3600, 1.7)
+
+    def test_interpolation(self):
+        correction = barycentre.BarycentricCorrection(CRAB)
+        exact = barycentre.delays(self.gps[::500], CRAB)
+        np.testing.assert_allclose(correction.delay(self.gps)[::500], exact, atol=1e-7)
+
+    def test_chunks(self):
+        whole = barycentre.BarycentricCorrection(CRAB).correct(self.gps)
+        correction = barycentre.BarycentricCorrection(CRAB)
+        chunks = np.concatenate([correction.correct(self.gps[first:first+1000])
+                                 for first in range(0, len(self.gps), 1000)])
+        np.testing.assert_array_equal(chunks, whole)
+        np.testing.assert_array_equal(np.diff(correction._grid), 60.0)
+
+    def test_in_place(self):
+        gps = self.gps.copy()
+        correction = barycentre.BarycentricCorrection(CRAB)
+        out = correction.correct(gps, out=gps)
+        self.assertIs(out, gps)
+        np.testing.assert_allclose(out - self.gps, correction.delay(self.gps))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_cache
+----------------------------------
+
+Tests for `pulsar_telescope.cache` module.
+"""
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import numpy as np
+
+from pulsar_telescope.cache import CaptureCache
+
+
+class TestCaptureCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = CaptureCache(os.path.join(self.directory, 'cache'))
+        self.captures = []
+        for i in range(3):
+            capture = os.path.join(self.directory, 'capture{0}.dat'.format(i))
+            np.arange(1000, dtype=np.float32).tofile(capture)
+            self.captures.append(capture)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_round_trip(self):
+        capture = self.captures[0]
+        self.assertIsNone(self.cache.load(capture, sample=1))
+        self.cache.store(capture, {'firsts': np.array([0, 10])}, sample=1)
+        entry = self.cache.load(capture, sample=1)
+        np.testing.assert_array_equal(entry['firsts'], [0, 10])
+        # Different parsing parameters have a different key
+        self.assertIsNone(self.cache.load(capture, sample=2))
+
+    def test_changed_capture(self):
+        capture = self.captures[0]
+        self.cache.store(capture, {'firsts': np.array([0])})
+        np.arange(2000, dtype=np.float32).tofile(capture)
+        self.assertIsNone(self.cache.load(capture))
+
+    def test_invalidate(self):
+        self.cache.store(self.captures[0], {'firsts': np.array([0])})
+        self.cache.store(self.captures[1], {'firsts': np.array([0])})
+        self.cache.invalidate(self.captures[0])
+        self.assertIsNone(self.cache.load(self.captures[0]))
+        self.assertIsNotNone(self.cache.load(self.captures[1]))
+        self.cache.clear()
+        self.assertEqual(self.cache.size(), 0)
+
+    def test_evict(self):
+        paths = []
+        for i, capture in enumerate(self.captures):
+            paths.append(self.cache.store(capture, {'data': np.zeros(1000)}))
+            os.utime(paths[-1], (time.time() - 100 + i, time.time() - 100 + i))
+        # Using the oldest entry makes it the most recently used
+        self.cache.load(self.captures[0])
+        removed = self.cache.evict(os.path.getsize(paths[0])*2)
+        self.assertEqual(removed, [paths[1]])
+        self.assertIsNotNone(self.cache.load(self.captures[0]))
+
+    def test_no_pickles(self):
+        # Entries holding objects would have to be unpickled to be read
+        capture = self.captures[0]
+        path = self.cache.store(capture, {'tags': np.array([{'a': 1}], dtype=object)})
+        self.assertIsNone(self.cache.load(capture))
+        self.assertFalse(os.path.exists(path))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_data
+----------------------------------
+
+Tests for `pulsar_telescope.data` module.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from pulsar_telescope.cache import CaptureCache
+from tests.test_metadata import _dict, _header, _symbol
+
+try:
+    from pulsar_telescope.data import TimeSeries
+except ImportError:
+    # pylightcurve is needed for the TimeSeries
+    TimeSeries = None
+
+
+@unittest.skipUnless(TimeSeries, "pylightcurve is not installed")
+class TestTimeSeries(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.capture = os.path.join(self.directory, 'capture.dat')
+        self.samples = (np.random.RandomState(0).normal(size=6000) + 10).astype(np.float32)
+        self.samples.tofile(self.capture)
+        with open(self.capture+'.hdr', 'wb') as fd:
+            fd.write(_header(1.0e9, 1000.0, 8000))
+            fd.write(_header(1.0e9 + 2, 1000.0, 8000))
+            # An overrun, after which 0.5 seconds were dropped
+            fd.write(_header(1.0e9 + 4.5, 1000.0, 8000, _dict([('source', _symbol('crab'))])))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_eager(self):
+        series = TimeSeries(self.capture)
+        # The samples are only held in the DataFrame
+        self.assertIsNone(series._raw)
+        np.testing.assert_array_equal(series.clc, self.samples)
+        self.assertEqual(series.samp_rate, 1000.0)
+        self.assertEqual(len(series.times), 6000)
+
+    def test_mmap(self):
+        series = TimeSeries(self.capture, mmap=True)
+        self.assertIsInstance(series._raw, np.memmap)
+        np.testing.assert_array_equal(series.clc, self.samples)
+        series.homogen(block=1)
+        series.baseline(window=1)
+        self.assertIsNone(series._data)
+        self.assertAlmostEqual(series.times[4000] - series.start, 4.5)
+        # The DataFrame is built when it is first used
+        np.testing.assert_array_equal(series.data['total power'].values, self.samples)
+        self.assertIsNone(series._raw)
+
+    def test_cache(self):
+        cache = CaptureCache(os.path.join(self.directory, 'cache'))
+        parsed = TimeSeries(self.capture, cache=cache)
+        cached = TimeSeries(self.capture, cache=cache)
+        self.assertEqual(len(os.listdir(cache.directory)), 1)
+        self.assertEqual(cached.samp_rate, parsed.samp_rate)
+        np.testing.assert_array_equal(cached.times, parsed.times)
+        np.testing.assert_array_equal(cached.overs, parsed.overs)
+        self.assertEqual(cached.tags[0]['key'], 'source')
+        self.assertEqual(cached.tags[0]['value'], 'crab')
+
+    def test_segment(self):
+        series = TimeSeries(self.capture)
+        segment = series.segment(1000, 4500)
+        self.assertEqual(segment.data_len, 3500)
+        self.assertTrue(np.shares_memory(segment._raw, series.data['total power'].values))
+        self.assertAlmostEqual(segment.start - series.start, 1.0)
+        # The overrun and the tag are at sample 4000 of the capture
+        np.testing.assert_array_equal(segment.overs['new_seg'], [3000])
+        np.testing.assert_array_equal(segment.tags['offset'], [3000])
+        self.assertEqual(segment.tags[0]['value'], 'crab')
+        self.assertAlmostEqual(segment.times[3000] - segment.start, 3.5)
+        # The parent's overruns and tags are unchanged
+        np.testing.assert_array_equal(series.overs['new_seg'], [4000])
+        np.testing.assert_array_equal(series.tags['offset'], [4000])
+
+    def test_iter_chunks(self):
+        chunks = list(TimeSeries.iter_chunks(self.capture, chunk_seconds=2.5))
+        self.assertEqual([chunk.data_len for chunk in chunks], [2500, 2500, 1000])
+        starts = [chunk.start - chunks[0].start for chunk in chunks]
+        np.testing.assert_allclose(starts, [0, 2.5, 5.5])
+        self.assertEqual([len(chunk.overs) for chunk in chunks], [0, 1, 0])
+        self.assertEqual(chunks[1].overs[0]['new_seg'], 1500)
+        self.assertEqual(chunks[1].tags[0]['offset'], 1500)
+        self.assertEqual([len(chunk.tags) for chunk in chunks], [0, 1, 0])
+        for chunk in chunks:
+            self.assertEqual(chunk.samp_rate, 1000.0)
+            # The chunks are views of the mapped capture, and are never
+            # read into a DataFrame
+            self.assertIsInstance(chunk._raw, np.memmap)
+            chunk.homogen(block=1)
+            self.assertIsNone(chunk._data)
+        np.testing.assert_array_equal(np.concatenate([chunk.clc for chunk in chunks]), self.samples)
+
+    def test_remove_outlier(self):
+        series = TimeSeries(self.capture)
+        cleaned = series.remove_outlier(lower=9, upper=11)
+        self.assertIsNot(cleaned, series)
+        self.assertIs(cleaned.headers, series.headers)
+        self.assertIs(cleaned.axis, series.axis)
+        np.testing.assert_array_equal(series.clc, self.samples)
+        outside = (self.samples < 9) | (self.samples > 11)
+        np.testing.assert_array_equal(np.isnan(cleaned.clc), outside)
+
+    def test_remove_outlier_inplace(self):
+        outside = (self.samples < 9) | (self.samples > 11)
+        for mmap in (False, True):
+            series = TimeSeries(self.capture, mmap=mmap)
+            self.assertIs(series.remove_outlier(lower=9, upper=11, inplace=True), series)
+            np.testing.assert_array_equal(np.isnan(series.clc), outside)
+        # The mapped capture is never written to
+        np.testing.assert_array_equal(np.fromfile(self.capture, dtype=np.float32), self.samples)
+
+    def test_remove_outlier_sigma(self):
+        self.samples[1234] += 30
+        self.samples.tofile(self.capture)
+        cleaned = TimeSeries(self.capture).remove_outlier(sigma=6, window=1)
+        np.testing.assert_array_equal(np.flatnonzero(np.isnan(cleaned.clc)), [1234])
+
+    def test_fold(self):
+        ephemeris = os.path.join(self.directory, 'crab.eph')
+        with open(ephemeris, 'w') as fd:
+            fd.write("1117000000 29.95\n1117086400 29.95\n")
+        self.samples[1234] = 1.0e4
+        self.samples.tofile(self.capture)
+        series = TimeSeries(self.capture)
+        series.fold(ephemeris)
+        np.testing.assert_array_equal(np.flatnonzero(series.rfi_mask), [1234])
+
+    def test_homogen_segment(self):
+        series = TimeSeries(self.capture)
+        series.segment(0, 3000).homogen(block=1)
+        np.testing.assert_array_equal(series.segment(0, 3000).clc, self.samples[:3000])
+        np.testing.assert_array_equal(series.clc, self.samples)
+
+    def test_baseline_segment(self):
+        series = TimeSeries(self.capture)
+        baselined = series.segment(0, 3000).baseline(window=1)
+        np.testing.assert_array_equal(series.segment(0, 3000).clc, self.samples[:3000])
+        self.assertLess(abs(np.median(baselined)), 0.1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_drive
+----------------------------------
+
+Tests for `pulsar_telescope.drive` module.
+"""
+
+import unittest
+
+from pulsar_telescope import drive, netiom
+
+
+def dac_word(card):
+    # The word on the DAC data pins, which are low for a set bit
+    return sum(2**i for i in range(8) if card.outputs[i] == '0')
+
+
+class FakeLabJack(object):
+    """
+    A LabJack whose power line restarts the card with every DAC data pin
+    high, as a restart of the netiom can leave them.
+    """
+
+    def __init__(self, card):
+        self.card = card
+
+    def BitStateWrite(self, line, state):
+        return line, state
+
+    def getFeedback(self, command):
+        line, state = command
+        if line == 4 and state:
+            self.card.outputs[:8] = ['1']*8
+
+
+class TestSetSpeed(unittest.TestCase):
+
+    def setUp(self):
+        self.card = netiom.FakeNetiom().start()
+        self.drive = drive.Drive(simulate=1, url=self.card.url)
+        self.drive.switch_simulate(0)
+
+    def tearDown(self):
+        self.drive.transport.close()
+        self.card.stop()
+
+    def test_first(self):
+        self.drive.set_speed(0.5)
+        self.assertEqual(len(self.card.commands), 11)
+        self.assertEqual(self.card.commands[0], 'B10')
+        self.assertEqual(self.card.commands[-2:], ['A10', 'B10'])
+        self.assertEqual(dac_word(self.card), int(0.25*255))
+        self.assertEqual(self.drive.dac_word, int(0.25*255))
+
+    def test_delta(self):
+        self.drive.set_speed(0.0)
+        del self.card.commands[:]
+        self.drive.set_speed(0.0)
+        self.assertEqual(self.card.commands, [])
+        # 127 to 126 only changes the lowest bit
+        self.drive.set_speed(0.01)
+        self.assertEqual(self.card.commands, ['B10', 'A01', 'A10', 'B10'])
+        self.assertEqual(dac_word(self.card), 126)
+
+    def test_sweep(self):
+        for v in [-1, -0.3, 0.2, 0.21, 0.9, 1, 0.0]:
+            self.drive.set_speed(v)
+            self.assertEqual(dac_word(self.card), int((1.0 - v)/2.0*255))
+
+    def test_simulate(self):
+        self.drive.switch_simulate(1)
+        self.drive.set_speed(0.5)
+        self.assertEqual(self.card.commands, [])
+        self.drive.switch_simulate(0)
+        self.drive.set_speed(0.5)
+        self.assertEqual(len(self.card.commands), 11)
+        self.assertEqual(dac_word(self.card), int(0.25*255))
+
+    def test_power_cycle(self):
+        self.drive.d = self.drive.u3 = FakeLabJack(self.card)
+        self.drive.warmup = 0
+        self.drive.set_speed(0.5)
+        self.drive.disable()
+        self.drive.enable()
+        self.assertEqual(dac_word(self.card), 0)
+        self.drive.set_speed(0.5)
+        self.assertEqual(dac_word(self.card), int(0.25*255))
+
+    def test_multi_command(self):
+        self.drive.multi_command = True
+        self.drive.set_speed(-0.5)
+        self.assertEqual(self.card.requests, 1)
+        self.assertEqual(len(self.card.commands), 11)
+        self.assertEqual(dac_word(self.card), int(0.75*255))
+
+    def test_failure(self):
+        self.drive.set_speed(0.5)
+        self.card.stop()
+        self.drive.transport.retries = 0
+        self.assertEqual(self.drive.set_speed(0.0), 1)
+        self.assertIsNone(self.drive.dac_word)
+
+
+class TestPositionLog(unittest.TestCase):
+
+    def setUp(self):
+        self.card = netiom.FakeNetiom().start()
+        self.drive = drive.Drive(simulate=1, url=self.card.url, log_size=4)
+        self.drive.switch_simulate(0)
+
+    def tearDown(self):
+        self.drive.transport.close()
+        self.card.stop()
+
+    def test_sample(self):
+        # Gray code 1 is position 1, reported lowest bit first
+        self.card.inputs = '1' + '0'*15
+        hh = self.drive.sample(6)
+        self.assertEqual(len(hh), 4)
+        self.assertEqual(list(self.drive.log.grays()), [1]*4)
+        self.assertAlmostEqual(hh[-1], 360.0/2**13)
+        self.assertAlmostEqual(hh[-1], self.drive.pos_degree)
+
+    def test_failed_read(self):
+        self.card.inputs = '1' + '0'*15
+        position = self.drive.read_position()
+        self.card.stop()
+        self.drive.transport.retries = 0
+        # The last good position is returned, and nothing is logged
+        self.assertEqual(self.drive.read_position(), position)
+        self.assertEqual(self.drive.log.total, 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_encoder
+----------------------------------
+
+Tests for `pulsar_telescope.encoder` module.
+"""
+
+import os
+import unittest
+
+import numpy as np
+
+from pulsar_telescope import encoder
+
+# The table the encoder was decoded with before it was calculated
+GRAYFILE = os.path.join(os.path.dirname(__file__), '..', 'telescope_software', 'graycode.txt')
+
+
+def status_line(gray):
+    # The netiom reports the lowest bit first, followed by unused inputs
+    return ''.join(str((gray >> i) & 1) for i in range(13)) + '101'
+
+
+class TestDecode(unittest.TestCase):
+
+    def setUp(self):
+        with open(GRAYFILE) as graycodefile:
+            self.grayindex = graycodefile.readlines()
+
+    def test_all_codes(self):
+        for gray in range(encoder.POSITIONS):
+            status = status_line(gray)
+            # The decoding previously done by Drive.read_position
+            s2 = ''.join(status[12-i] for i in range(13))
+            expected = int(float(self.grayindex[int(s2, base=2)][:-3]))
+            self.assertEqual(encoder.gray(status), gray)
+            self.assertEqual(encoder.decode(status), expected)
+
+    def test_many(self):
+        codes = np.arange(encoder.POSITIONS)
+        expected = [int(float(line)) for line in self.grayindex]
+        np.testing.assert_array_equal(encoder.decode_many(codes), expected)
+
+    def test_loaded_once(self):
+        self.assertIs(encoder.table(), encoder.table())
+
+
+if __name__ == '__main__':
+    unittest.main()
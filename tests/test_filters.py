@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_filters
+----------------------------------
+
+Tests for `pulsar_telescope.filters` module.
+"""
+
+import unittest
+
+import numpy as np
+
+from pulsar_telescope import filters
+
+
+class TestNormaliseBlocks(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(1054)
+        self.data = rng.normal(size=1050)*np.repeat([1.0, 3.0, 0.5], 350)
+        self.data[17] = np.nan
+
+    def test_blocks(self):
+        out = filters.normalise_blocks(self.data, 100)
+        for first in range(0, 1050, 100):
+            block = self.data[first:first+100]
+            np.testing.assert_allclose(out[first:first+100], block/np.nanvar(block))
+
+    def test_in_place(self):
+        expected = filters.normalise_blocks(self.data, 100)
+        data = self.data.copy()
+        out = filters.normalise_blocks(data, 100, out=data)
+        self.assertIs(out, data)
+        np.testing.assert_allclose(data, expected)
+
+class TestMadOutliers(unittest.TestCase):
+
+    def test_outliers(self):
+        rng = np.random.RandomState(1054)
+        data = rng.normal(size=1050) + np.repeat([0.0, 100.0, -50.0], 350)
+        spikes = [5, 400, 1049]
+        data[spikes] += 20
+        data[30] = np.nan
+        outliers = filters.mad_outliers(data, 100, 6)
+        np.testing.assert_array_equal(np.flatnonzero(outliers), spikes)
+
+    def test_step(self):
+        # Only samples within a quarter of a window of a change of level
+        # are judged against the other side of it
+        rng = np.random.RandomState(1054)
+        for step in range(110, 200, 20):
+            data = rng.normal(size=1000)
+            data[step:] += 50
+            outliers = np.flatnonzero(filters.mad_outliers(data, 100, 6))
+            self.assertTrue(np.all(np.abs(outliers - step) <= 25))
+
+    def test_short_window(self):
+        data = np.random.RandomState(1054).normal(size=100)
+        self.assertFalse(filters.mad_outliers(data, 0.5, 6).any())
+        # A window longer than the data covers all of it
+        np.testing.assert_array_equal(filters.mad_outliers(np.array([0.0, 1.0, 20.0]), 100, 6),
+                                      [False, False, True])
+
+class TestRunningPercentile(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(1054)
+        self.data = np.round(rng.normal(size=2000), 1)
+        self.data[[10, 11, 500, 1999]] = np.nan
+
+    def test_percentiles(self):
+        for q in (10, 50, 90):
+            values = filters.RunningPercentile(31, q).filter(self.data)
+            for i in range(len(self.data)):
+                window = np.sort(self.data[max(i-30, 0):i+1])
+                window = window[np.isfinite(window)]
+                expected = window[int(q/100.0*(len(window) - 1) + 0.5)]
+                self.assertEqual(values[i], expected)
+
+    def test_chunks(self):
+        whole = filters.RunningPercentile(101, 25).filter(self.data)
+        running = filters.RunningPercentile(101, 25)
+        chunks = np.concatenate([running.filter(self.data[first:first+123])
+                                 for first in range(0, len(self.data), 123)])
+        np.testing.assert_array_equal(chunks, whole)
+
+    def test_centred(self):
+        baseline = filters.running_percentile(self.data, 21, chunk=100)
+        for i in range(len(self.data)):
+            window = self.data[max(i-10, 0):i+11]
+            window = np.sort(window[np.isfinite(window)])
+            self.assertEqual(baseline[i], window[len(window)//2])
+
+
+class TestRFIExcision(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(1054)
+        self.data = rng.normal(size=5000)
+        self.bursts = [1200, 1201, 1202, 3333]
+        self.data[self.bursts] += 30
+        self.data[2500] = np.nan
+
+    def test_running_median(self):
+        median = filters.RunningMedian(5)
+        values = [median.push(value) for value in self.data[:100].tolist()]
+        for i in range(4, 100):
+            self.assertEqual(values[i], np.median(self.data[i-4:i+1]))
+
+    def test_flags(self):
+        cleaned, mask = filters.RFIExcision(200, sigma=8).filter(self.data)
+        np.testing.assert_array_equal(np.flatnonzero(mask), sorted(self.bursts + [2500]))
+        self.assertTrue(np.all(cleaned[mask] == 0))
+        np.testing.assert_array_equal(cleaned[~mask], self.data[~mask])
+
+    def test_blocks(self):
+        whole = filters.RFIExcision(200, sigma=8).filter(self.data)
+        blocks = filters.RFIExcision(200, sigma=8).filter(self.data, block=777)
+        np.testing.assert_array_equal(whole[1], blocks[1])
+        samples = filters.RFIExcision(200, sigma=8).filter(self.data[:1000], block=1)
+        np.testing.assert_array_equal(whole[1][:1000], samples[1])
+
+    def test_warm_up(self):
+        data = self.data.copy()
+        data[[50, 199, 200]] += 30
+        _, mask = filters.RFIExcision(200, sigma=8).filter(data)
+        np.testing.assert_array_equal(np.flatnonzero(mask[:1000]), [200])
+
+if __name__ == '__main__':
+    unittest.main()
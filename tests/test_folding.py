@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_folding
+----------------------------------
+
+Tests for `pulsar_telescope.folding` module.
+"""
+
+import unittest
+
+import numpy as np
+
+from pulsar_telescope import folding
+
+
+def fold_loop(data, time, frequency, sample):
+    # The per-sample fold which TimeSeries.fold used to perform.
+    period = 1.0 / frequency
+    period_s = int(np.floor(sample*period))
+    number_p = int(np.floor(len(data)/period_s))
+    phase = frequency * (time-time[0])
+    stack = np.zeros((period_s, number_p+1))
+    stackcount = np.zeros((period_s, number_p+1))
+    for i in np.arange(len(phase)):
+        phase_b = int(np.round((phase[i] % 1) *(1/frequency)*sample))
+        period = int(np.floor(phase_b / period_s))
+        phasey = int(phase_b % period_s)
+        stack[phasey, period] += data[i]
+        if data[i] != 0:
+            stackcount[phasey, period] += 1
+    return stack, stackcount
+
+
+class TestFold(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(1054)
+        self.sample = 1000.0
+        self.frequency = 29.946923
+        self.time = np.arange(20000)/self.sample
+        phase = self.frequency*self.time
+        self.data = rng.normal(size=len(self.time)) + 5*np.exp(-((phase % 1) - 0.3)**2/0.001)
+        self.data[rng.randint(0, len(self.data), 100)] = 0
+
+    def test_matches_loop(self):
+        expected = fold_loop(self.data, self.time, self.frequency, self.sample)
+        phase = self.frequency*(self.time - self.time[0])
+        stack, stackcount = folding.fold(self.data, phase, self.frequency, self.sample)
+        np.testing.assert_array_equal(stack, expected[0])
+        np.testing.assert_array_equal(stackcount, expected[1])
+
+    def test_mask(self):
+        phase = self.frequency*self.time
+        mask = np.zeros(len(self.data), dtype=bool)
+        mask[::7] = True
+        stack, stackcount = folding.fold(self.data, phase, self.frequency, self.sample, mask=mask)
+        self.assertEqual(stackcount.sum(), np.count_nonzero(self.data[~mask]))
+        self.assertAlmostEqual(stack.sum(), self.data[~mask].sum())
+
+    def test_profile(self):
+        phase = self.frequency*self.time
+        stack, stackcount = folding.fold(self.data, phase, self.frequency, self.sample)
+        profile = stack.sum(axis=1)/stackcount.sum(axis=1)
+        self.assertEqual(np.argmax(profile), int(round(0.3*self.sample/self.frequency)))
+
+class TestPhasePredictor(unittest.TestCase):
+
+    def setUp(self):
+        self.times = 1117000000.0 + np.arange(0, 86400, 3600.0)
+        self.frequencies = 29.946923 - 3.77535e-10*(self.times - self.times[0])
+        self.predictor = folding.PhasePredictor(self.times, self.frequencies)
+
+    def test_frequency(self):
+        times = self.times[0] + np.linspace(0, 80000, 50)
+        np.testing.assert_allclose(self.predictor.frequency(times),
+                                   np.interp(times, self.times, self.frequencies), rtol=1e-14)
+        np.testing.assert_allclose(self.predictor.fdot(times), -3.77535e-10, rtol=1e-6)
+
+    def test_phase(self):
+        dt = np.linspace(0, 80000, 50)
+        expected = 29.946923*dt - 0.5*3.77535e-10*dt**2
+        np.testing.assert_allclose(self.predictor.phase(self.times[0] + dt), expected, atol=1e-6)
+
+    def test_constant(self):
+        predictor = folding.PhasePredictor([1117000000.0], [30.0])
+        self.assertAlmostEqual(predictor.phase(1117000010.0), 300.0)
+
+class TestFoldAccumulator(unittest.TestCase):
+
+    def test_blocks(self):
+        rng = np.random.RandomState(1054)
+        sample, frequency = 1000.0, 29.946923
+        data = rng.normal(size=150000)
+        whole = folding.FoldAccumulator(frequency, sample, 1117000000.0, subint=10)
+        whole.add(data)
+        blocks = folding.FoldAccumulator(frequency, sample, 1117000000.0, subint=10)
+        for first in range(0, len(data), 7001):
+            blocks.add(data[first:first+7001])
+        self.assertEqual(blocks.stack.shape, (33, 15))
+        np.testing.assert_allclose(blocks.stack, whole.stack)
+        np.testing.assert_array_equal(blocks.stackcount, whole.stackcount)
+        self.assertEqual(blocks.stackcount.sum(), len(data))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_graycode
+----------------------------------
+
+Tests for `pulsar_telescope.graycode` module.
+"""
+
+import unittest
+
+import numpy as np
+
+from pulsar_telescope import graycode
+
+
+def reflected(nbits):
+    # Build the reflected binary code by mirroring, as a reference
+    codes = ['']
+    for _ in range(nbits):
+        codes = ['0' + code for code in codes] + ['1' + code for code in reversed(codes)]
+    return [int(code, 2) for code in codes]
+
+
+class TestGrayCode(unittest.TestCase):
+
+    def test_reflected(self):
+        for bits in range(1, 12):
+            np.testing.assert_array_equal(graycode.encode_table(bits), reflected(bits))
+
+    def test_inverse(self):
+        for bits in (1, 2, 7, 8, 13, 16, 17, 20):
+            codes = graycode.encode_table(bits)
+            np.testing.assert_array_equal(graycode.decode(codes, bits), np.arange(1 << bits))
+            table = graycode.decode_table(bits)
+            np.testing.assert_array_equal(table[codes], np.arange(1 << bits))
+
+    def test_single_bit(self):
+        codes = graycode.encode_table(16).astype(np.int64)
+        changes = codes ^ np.roll(codes, 1)
+        self.assertTrue(np.all((changes & (changes - 1)) == 0))
+
+    def test_scalar(self):
+        self.assertEqual(graycode.encode(6), 5)
+        self.assertEqual(graycode.decode(5), 6)
+        self.assertEqual(graycode.to_strings(graycode.encode(6), 4), ['0101'])
+
+
+if __name__ == '__main__':
+    unittest.main()
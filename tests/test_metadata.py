@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_metadata
+----------------------------------
+
+Tests for `pulsar_telescope.metadata` module.
+"""
+
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+
+import numpy as np
+
+from pulsar_telescope import metadata
+
+
+def _symbol(s):
+    return struct.pack('>BH', 2, len(s)) + s.encode('ascii')
+
+
+def _dict(items):
+    # Serialised in the order GNU Radio builds its headers, with the
+    # most recently added key first.
+    out = b''
+    for key, value in reversed(items):
+        out += struct.pack('>BB', 7, 7) + _symbol(key) + value
+    return out + struct.pack('>B', 6)
+
+
+def _header(rx_time, rx_rate, nbytes, extra=b''):
+    secs = int(rx_time)
+    items = [('version', struct.pack('>Bi', 3, 0)),
+             ('rx_rate', struct.pack('>Bd', 4, rx_rate)),
+             ('rx_time', struct.pack('>BIBQBd', 12, 2, 11, secs, 4, rx_time - secs)),
+             ('size', struct.pack('>Bi', 3, 4)),
+             ('type', struct.pack('>Bi', 3, 5)),
+             ('cplx', struct.pack('>B', 1)),
+             ('strt', struct.pack('>BQ', 11, metadata.HEADER_LENGTH + len(extra))),
+             ('bytes', struct.pack('>BQ', 11, nbytes))]
+    return _dict(items) + extra
+
+
+class TestMetadata(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.head_file = os.path.join(self.directory, 'capture.dat.hdr')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_header_length(self):
+        self.assertEqual(len(_header(1.0e9, 1000.0, 4000)), metadata.HEADER_LENGTH)
+
+    def test_read_headers(self):
+        extra = _dict([('source', _symbol('crab'))])
+        with open(self.head_file, 'wb') as fd:
+            fd.write(_header(1.0e9, 1000.0, 4000))
+            # A continuation segment, followed on from the first
+            fd.write(_header(1.0e9 + 1, 1000.0, 4000))
+            # An overrun, after which 0.5 seconds were dropped
+            fd.write(_header(1.0e9 + 2.5, 1000.0, 2000, extra))
+        headers, tags = metadata.read_headers(self.head_file)
+        np.testing.assert_array_equal(headers['offset'], [0, 1000, 2000])
+        np.testing.assert_array_equal(headers['nitems'], [1000, 1000, 500])
+        np.testing.assert_allclose(headers['rx_time'], [1.0e9, 1.0e9 + 1, 1.0e9 + 2.5])
+        self.assertEqual(headers['extra_len'][2], len(extra))
+        self.assertEqual(len(tags), 1)
+        self.assertEqual(tags[0]['offset'], 2000)
+        self.assertEqual(tags[0]['key'], 'source')
+        self.assertEqual(tags[0]['value'], 'crab')
+
+        overs = metadata.find_overruns(headers)
+        self.assertEqual(len(overs), 1)
+        self.assertEqual(overs[0]['new_seg'], 2000)
+        self.assertAlmostEqual(overs[0]['new_time'], 1.0e9 + 2.5)
+
+    def test_unchanged_timestamp(self):
+        with open(self.head_file, 'wb') as fd:
+            fd.write(_header(1.0e9, 1000.0, 4000))
+            fd.write(_header(1.0e9, 1000.0, 4000))
+        headers, tags = metadata.read_headers(self.head_file)
+        self.assertEqual(len(metadata.find_overruns(headers)), 0)
+        self.assertEqual(len(tags), 0)
+
+    def test_tags_json(self):
+        values = ['crab', 3, 2.5, None, True, 1+2j, (1, 'a'), {'x': (2.0,)},
+                  np.arange(3, dtype='>f4')]
+        tags = np.array([(i, 'key', value) for i, value in enumerate(values)],
+                        dtype=metadata.TAG_DTYPE)
+        restored = metadata.tags_from_json(metadata.tags_to_json(tags))
+        np.testing.assert_array_equal(restored['offset'], tags['offset'])
+        for value, tag in zip(values, restored):
+            if isinstance(value, np.ndarray):
+                self.assertEqual(tag['value'].dtype, value.dtype)
+                np.testing.assert_array_equal(tag['value'], value)
+            else:
+                self.assertEqual(tag['value'], value)
+                self.assertIs(type(tag['value']), type(value))
+        self.assertEqual(len(metadata.tags_from_json(metadata.tags_to_json(tags[:0]))), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_netiom
+----------------------------------
+
+Tests for `pulsar_telescope.netiom` module.
+"""
+
+import unittest
+
+from pulsar_telescope import drive, netiom
+
+
+class TestHTTPTransport(unittest.TestCase):
+
+    def setUp(self):
+        self.card = netiom.FakeNetiom().start()
+        self.transport = netiom.HTTPTransport(self.card.url, retries=2, backoff=0.001)
+
+    def tearDown(self):
+        self.transport.close()
+        self.card.stop()
+
+    def test_commands(self):
+        for command in ['A09', 'B10', 'A01']:
+            self.transport.send(command)
+        self.assertEqual(self.card.commands, ['A09', 'B10', 'A01'])
+        self.assertEqual(self.transport.lines('digitaloutputs.cgi'), ['10000000', '10000000'])
+
+    def test_keep_alive(self):
+        self.transport.send('A09')
+        connection = self.transport._connection
+        sock = connection.sock
+        self.transport.send('B09')
+        self.assertIs(self.transport._connection, connection)
+        self.assertIs(connection.sock, sock)
+
+    def test_reconnect(self):
+        self.transport.send('A09')
+        # The card drops the connection
+        self.transport._connection.sock.close()
+        self.transport.send('B09')
+        self.assertEqual(self.card.commands, ['A09', 'B09'])
+
+    def test_failure(self):
+        self.card.stop()
+        self.assertRaises(IOError, self.transport.send, 'A09')
+
+    def test_timeout(self):
+        self.card.latency = 0.2
+        transport = netiom.HTTPTransport(self.card.url, timeout=0.05, retries=1, backoff=0.001)
+        self.assertRaises(IOError, transport.send, 'A09')
+
+
+class TestDriveTransport(unittest.TestCase):
+
+    def setUp(self):
+        self.card = netiom.FakeNetiom().start()
+        self.drive = drive.Drive(simulate=1, url=self.card.url)
+        self.drive.switch_simulate(0)
+
+    def tearDown(self):
+        self.drive.transport.close()
+        self.card.stop()
+
+    def test_sendstr(self):
+        self.assertEqual(self.drive.sendstr(['A09', 'B10']), 0)
+        self.assertEqual(self.card.commands, ['A09', 'B10'])
+        self.assertEqual(self.drive.motor(), 'on')
+
+    def test_read_position(self):
+        # Gray code 1 is at index 1, reported lowest bit first
+        self.card.inputs = '1' + '0'*15
+        self.assertAlmostEqual(self.drive.read_position(), 360.0/8192)
+
+    def test_unreachable(self):
+        self.card.stop()
+        self.drive.transport.retries = 0
+        self.assertEqual(self.drive.sendstr(['A09']), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_pointing
+----------------------------------
+
+Tests for `pulsar_telescope.pointing` module.
+"""
+
+import math
+import unittest
+
+import ephem
+import numpy as np
+
+from pulsar_telescope import pointing
+
+
+def acre_road():
+    observatory = ephem.Observer()
+    observatory.long, observatory.lat, observatory.elev = "-4:18:25.93", "55:54:8.29", 50
+    observatory.pressure = 0
+    return observatory
+
+
+def crab():
+    return ephem.readdb("Crab pulsar,f|L,05:34:31.97,22:0:52.1,0,2000")
+
+
+class TestPointingTable(unittest.TestCase):
+
+    def setUp(self):
+        self.observatory = acre_road()
+        self.date = ephem.Date('2026/01/10 03:00:00')
+        start, end = pointing.night_of(self.date)
+        self.table = pointing.PointingTable(crab(), self.observatory, start, end)
+
+    def test_hour_angle(self):
+        source = crab()
+        for date in self.table.start + np.linspace(0, 1, 37):
+            self.observatory.date = date
+            source.compute(self.observatory)
+            hh = math.degrees(self.observatory.sidereal_time() - source.ra)
+            hh = (hh + 180.0) % 360.0 - 180.0
+            self.assertAlmostEqual(float(self.table.hour_angle(date)), hh, delta=1e-4)
+            lst = math.degrees(self.observatory.sidereal_time())
+            self.assertAlmostEqual(float(self.table.sidereal_time(date)), lst, delta=1e-4)
+
+    def test_observatory_unchanged(self):
+        date = self.observatory.date
+        pointing.PointingTable(crab(), self.observatory, self.table.start, self.table.start + 0.1)
+        self.assertEqual(self.observatory.date, date)
+
+    def test_windows(self):
+        windows = self.table.windows()
+        self.assertEqual(windows.shape[1], 2)
+        for opens, closes in windows:
+            self.assertAlmostEqual(float(self.table.hour_angle(opens)), self.table.east_stop, delta=1e-3)
+            self.assertAlmostEqual(float(self.table.hour_angle(closes)), self.table.west_stop, delta=1e-3)
+        dates = self.table.start + np.linspace(0, 1, 1001)
+        inside = np.zeros(len(dates), dtype=bool)
+        for opens, closes in windows:
+            inside |= (dates > opens) & (dates < closes)
+        np.testing.assert_array_equal(self.table.visible(dates), inside)
+
+    def test_outside(self):
+        self.assertRaises(ValueError, self.table.hour_angle, self.table.end + 0.1)
+
+    def test_fixed_ra(self):
+        table = pointing.PointingTable('05:34:31.97', self.observatory, self.table.start, self.table.end)
+        date = self.table.start + 0.25
+        self.observatory.date = date
+        hh = math.degrees(self.observatory.sidereal_time() - ephem.hours('05:34:31.97'))
+        self.assertAlmostEqual(float(table.hour_angle(date)), (hh + 180.0) % 360.0 - 180.0, delta=1e-4)
+
+
+class TestTableFor(unittest.TestCase):
+
+    def setUp(self):
+        pointing.clear_tables()
+
+    def test_cached(self):
+        observatory = acre_road()
+        date = ephem.Date('2026/01/10 03:00:00')
+        table = pointing.table_for(crab(), observatory, date)
+        self.assertIs(pointing.table_for(crab(), observatory, date + 0.2), table)
+        self.assertIsNot(pointing.table_for(crab(), observatory, date + 1), table)
+        self.assertIsNot(pointing.table_for(crab(), observatory, date, west_stop=90), table)
+
+    def test_limit(self):
+        observatory = acre_road()
+        for night in range(pointing.MAX_TABLES + 5):
+            pointing.table_for('00:00:00', observatory, 46000 + night)
+        self.assertEqual(len(pointing._tables), pointing.MAX_TABLES)
+
+
+if __name__ == '__main__':
+    unittest.main()
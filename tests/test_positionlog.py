@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_positionlog
+----------------------------------
+
+Tests for `pulsar_telescope.positionlog` module.
+"""
+
+import unittest
+
+import numpy as np
+from astropy.time import Time
+
+from pulsar_telescope import positionlog
+
+
+class TestPositionLog(unittest.TestCase):
+
+    def setUp(self):
+        self.log = positionlog.PositionLog(5)
+
+    def fill(self, n):
+        for i in range(n):
+            self.log.append(1.5e9 + i, i, 2.0*i, i - 10.0)
+
+    def test_empty(self):
+        self.assertEqual(len(self.log), 0)
+        self.assertEqual(len(self.log.times()), 0)
+        self.assertEqual(len(self.log.gps()), 0)
+        self.assertRaises(ValueError, self.log.at, [1.0e9])
+
+    def test_partial(self):
+        self.fill(3)
+        self.assertEqual(len(self.log), 3)
+        np.testing.assert_array_equal(self.log.grays(), [0, 1, 2])
+        np.testing.assert_array_equal(self.log.degrees(last=2), [2.0, 4.0])
+
+    def test_wrap(self):
+        self.fill(12)
+        self.assertEqual(len(self.log), 5)
+        self.assertEqual(self.log.total, 12)
+        np.testing.assert_array_equal(self.log.grays(), np.arange(7, 12))
+        np.testing.assert_array_equal(self.log.hour_angles(last=2), [0.0, 1.0])
+        self.assertEqual(self.log.since(1.5e9 + 9), 3)
+
+    def test_views(self):
+        self.fill(7)
+        times = self.log.times()
+        # The accessors return views of the buffer, which are read-only
+        self.assertFalse(times.flags.owndata)
+        self.assertFalse(times.flags.writeable)
+        self.assertTrue(np.all(np.diff(times) == 1))
+
+    def test_at(self):
+        self.fill(4)
+        gps = Time(1.5e9 + 1.5, format='unix').gps
+        self.assertAlmostEqual(self.log.at(gps), -8.5, places=5)
+
+    def test_clear(self):
+        self.fill(7)
+        self.log.clear()
+        self.assertEqual(len(self.log), 0)
+        self.fill(2)
+        np.testing.assert_array_equal(self.log.grays(), [0, 1])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_scheduler
+----------------------------------
+
+Tests for `pulsar_telescope.scheduler` module.
+"""
+
+import time
+import unittest
+
+import ephem
+import numpy as np
+
+from pulsar_telescope import scheduler
+
+
+def acre_road():
+    observatory = ephem.Observer()
+    observatory.long, observatory.lat, observatory.elev = "-4:18:25.93", "55:54:8.29", 50
+    observatory.pressure = 0
+    return observatory
+
+
+class TestScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.crab = scheduler.Target(ephem.readdb("Crab pulsar,f|L,05:34:31.97,22:0:52.1,0,2000"), 3)
+        self.b0329 = scheduler.Target(ephem.readdb("B0329+54,f|L,03:32:59.37,54:34:43.6,0,2000"), 1)
+        self.b1933 = scheduler.Target(ephem.readdb("B1933+16,f|L,19:35:47.8,16:16:40,0,2000"), 2, dwell=3600)
+        self.scheduler = scheduler.Scheduler([self.crab, self.b0329, self.b1933], acre_road())
+        self.start = ephem.Date('2026/01/10 12:00')
+
+    def check(self, plan, start, end, targets):
+        self.assertAlmostEqual(plan[0].start, start)
+        self.assertAlmostEqual(plan[-1].end, end)
+        for before, after in zip(plan[:-1], plan[1:]):
+            self.assertEqual(before.end, after.start)
+        for block in plan:
+            if block.kind == 'observe':
+                self.assertIn(block.target, targets)
+                dates = np.linspace(block.start, block.end, 20)[1:-1]
+                hh = self.scheduler.hour_angles(block.target, dates)
+                self.assertTrue(np.all((hh > -110) & (hh < 110)))
+            if block.kind == 'slew':
+                following = plan[plan.index(block) + 1]
+                if following.target is block.target and following is not plan[-1]:
+                    self.assertGreaterEqual((following.end - following.start)*86400,
+                                            block.target.dwell - 1)
+
+    def test_plan(self):
+        plan = self.scheduler.plan(self.start)
+        self.check(plan, self.start, self.start + 1, [self.crab, self.b0329, self.b1933])
+        # The Crab has the highest priority, so it is observed for the
+        # whole of its window
+        window, = self.scheduler.windows(self.crab, self.start, self.start + 1)
+        crab = [block for block in plan if block.target is self.crab and block.kind == 'observe']
+        self.assertEqual(len(crab), 1)
+        self.assertLess(crab[0].start - window[0], 600/86400.0)
+        self.assertLess(window[1] - crab[0].end, 300/86400.0)
+
+    def test_replan(self):
+        self.scheduler.plan(self.start)
+        began = time.time()
+        plan = self.scheduler.plan(self.start + 0.4, position=30.0, exclude=['Crab pulsar'])
+        self.assertLess(time.time() - began, 1.0)
+        self.check(plan, self.start + 0.4, self.start + 1.4, [self.b0329, self.b1933])
+
+    def test_no_targets(self):
+        plan = self.scheduler.plan(self.start, self.start + 0.1, exclude=[self.crab, self.b0329, self.b1933])
+        self.assertEqual([block.kind for block in plan], ['idle'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_search
+----------------------------------
+
+Tests for `pulsar_telescope.search` module.
+"""
+
+import unittest
+
+import numpy as np
+
+from pulsar_telescope import search
+
+
+class TestSearch(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(1054)
+        self.samp_rate = 1000.0
+        self.frequency = 29.946923
+        self.fdot = -2e-5
+        self.times = np.arange(400000)/self.samp_rate
+        phase = self.frequency*self.times + 0.5*self.fdot*self.times**2
+        self.data = rng.normal(size=len(self.times)) + 0.5*np.exp(-((phase % 1) - 0.3)**2/0.001)
+
+    def test_harmonic_spectrum(self):
+        rng = np.random.RandomState(531)
+        phase = self.frequency*self.times[:100000]
+        data = rng.normal(size=len(phase)) + 0.5*np.exp(-((phase % 1) - 0.3)**2/0.01)
+        frequencies, power = search.harmonic_spectrum(data, self.samp_rate)
+        self.assertAlmostEqual(frequencies[np.argmax(power)], self.frequency, delta=0.02)
+
+    def test_fold_search(self):
+        frequencies = self.frequency + np.linspace(-0.01, 0.01, 201)
+        fdots = np.linspace(-4e-5, 0, 9)
+        periodogram, best = search.fold_search(self.data, self.times, frequencies, fdots)
+        self.assertEqual(periodogram.shape, (9, 201))
+        self.assertAlmostEqual(best[0], self.frequency, delta=2e-4)
+        self.assertAlmostEqual(best[1], self.fdot, delta=5e-6)
+
+    def test_workers(self):
+        frequencies = self.frequency + np.linspace(-0.01, 0.01, 51)
+        fdots = np.linspace(-4e-5, 0, 3)
+        serial = search.fold_search(self.data, self.times, frequencies, fdots)
+        parallel = search.fold_search(self.data, self.times, frequencies, fdots, workers=2)
+        np.testing.assert_allclose(parallel[0], serial[0], rtol=1e-8)
+        self.assertEqual(parallel[1][:2], serial[1][:2])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_timeaxis
+----------------------------------
+
+Tests for `pulsar_telescope.timeaxis` module.
+"""
+
+import unittest
+
+import numpy as np
+
+from pulsar_telescope.timeaxis import TimeAxis
+
+
+class TestTimeAxis(unittest.TestCase):
+
+    def setUp(self):
+        # 100 samples at 10 Hz, with an overrun at sample 40 which
+        # skips 2.5 seconds.
+        self.axis = TimeAxis([0, 40], [1117000000.0, 1117000006.5], 10, 100)
+
+    def test_times(self):
+        times = self.axis.gps()
+        self.assertEqual(len(times), 100)
+        self.assertAlmostEqual(times[0], 1117000000.0)
+        self.assertAlmostEqual(times[39], 1117000003.9)
+        self.assertAlmostEqual(times[40], 1117000006.5)
+        self.assertAlmostEqual(times[99], 1117000012.4)
+
+    def test_indexing(self):
+        np.testing.assert_allclose(self.axis[38:42], self.axis.gps([38, 39, 40, 41]))
+        self.assertAlmostEqual(self.axis[40], 1117000006.5)
+
+    def test_relative(self):
+        np.testing.assert_allclose(self.axis.relative([0, 1, 40]), [0, 0.1, 6.5])
+
+    def test_sample_at(self):
+        samples = np.arange(100)
+        np.testing.assert_array_equal(self.axis.sample_at(self.axis.gps(samples)), samples)
+
+    def test_sample_at_gap(self):
+        axis = TimeAxis([0, 4000], [100.0, 104.5], 1000.0, 6000)
+        np.testing.assert_array_equal(axis.sample_at([104.2, 104.49, 104.5, 103.999]),
+                                      [4000, 4000, 4000, 3999])
+
+    def test_gaps(self):
+        gaps = self.axis.gaps
+        self.assertEqual(len(gaps), 1)
+        self.assertEqual(gaps[0]['start_sample'], 40)
+        self.assertAlmostEqual(gaps[0]['gps_time'], 1117000006.5)
+        self.assertAlmostEqual(gaps[0]['missing'], 2.5)
+
+    def test_fill_matches_lookup(self):
+        samples = np.arange(100)
+        np.testing.assert_array_equal(self.axis.relative(), self.axis.relative(samples))
+        out = np.zeros(100)
+        self.assertIs(self.axis.gps(out=out), out)
+        np.testing.assert_array_equal(self.axis[25:75], self.axis.gps(samples[25:75]))
+
+    def test_slice(self):
+        part = self.axis.slice(30, 60)
+        self.assertEqual(len(part), 30)
+        np.testing.assert_allclose(part.gps(), self.axis.gps()[30:60])
+        part = self.axis.slice(50, 60)
+        np.testing.assert_array_equal(part.firsts, [0])
+        np.testing.assert_allclose(part.gps(), self.axis.gps()[50:60])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_tracking
+----------------------------------
+
+Tests for `pulsar_telescope.tracking` module.
+"""
+
+import unittest
+
+import ephem
+import numpy as np
+
+from pulsar_telescope import drive, tracking
+
+
+class FakeDrive(object):
+    """
+    A drive which turns at the speed it was last set to, and advances
+    its clock by a fixed time on every read of the encoder.
+    """
+
+    east_stop, west_stop = -110, 110
+
+    def __init__(self, date, position, max_rate=1.0):
+        self.observatory = drive.Acre_Road
+        self.date = date
+        self.position = position
+        self.max_rate = max_rate
+        self.speed = 0.0
+        self.parked = False
+        self.enabled = False
+
+    def read_position(self):
+        self.position += self.speed*self.max_rate*0.5
+        self.date += 0.5/86400
+        return self.position
+
+    def set_speed(self, v):
+        self.speed = v
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def park(self):
+        self.parked = True
+
+
+class TestHistogram(unittest.TestCase):
+
+    def test_counts(self):
+        histogram = tracking.Histogram([0, 0.1, 0.2, 0.5])
+        for value in [0.05, 0.15, 0.15, 0.3, 2.0, -1.0]:
+            histogram.add(value)
+        np.testing.assert_array_equal(histogram.counts, [2, 2, 2])
+        self.assertEqual(len(histogram), 6)
+        self.assertEqual(histogram.largest, 2.0)
+        self.assertEqual(histogram.percentile(50), 0.2)
+
+
+class TestTrackingController(unittest.TestCase):
+
+    def setUp(self):
+        self.crab = ephem.readdb("Crab pulsar,f|L,05:34:31.97,22:0:52.1,0,2000")
+        self.date = ephem.Date('2026/01/11 00:00')
+
+    def test_sidereal_rate(self):
+        controller = tracking.TrackingController(FakeDrive(self.date, 0.0), self.crab)
+        _, rate = controller.target(float(self.date))
+        self.assertAlmostEqual(rate, 360.0/tracking.SIDEREAL_DAY, delta=1e-6)
+
+    def test_feed_forward(self):
+        # On target, only the feed-forward speed is set
+        controller = tracking.TrackingController(FakeDrive(self.date, 0.0), self.crab, max_rate=0.5)
+        diff, speed = controller.control(10.0, 0.004, 10.0)
+        self.assertEqual(diff, 0.0)
+        self.assertAlmostEqual(speed, 0.008)
+        diff, speed = controller.control(10.0, 0.004, 5.0)
+        self.assertAlmostEqual(speed, 0.008 + (5/360.0)**0.25)
+
+    def test_converges(self):
+        dish = FakeDrive(self.date, 0.0)
+        controller = tracking.TrackingController(dish, self.crab, tolerance=0.01)
+        for _ in range(400):
+            self.assertTrue(controller.step(dish.date))
+        self.assertLess(abs(controller.error), 0.05)
+        self.assertEqual(len(controller.encoder_latency), 400)
+        self.assertEqual(len(controller.write_latency), 400)
+        self.assertGreater(len(controller.command_latency), 0)
+
+    def test_command_latency(self):
+        # The latency is only counted once the encoder shows the motion
+        dish = FakeDrive(self.date, 0.0, max_rate=0.0)
+        controller = tracking.TrackingController(dish, self.crab)
+        for _ in range(5):
+            controller.step(dish.date)
+        self.assertEqual(len(controller.command_latency), 0)
+        dish.max_rate = 1.0
+        controller.step(dish.date)
+        self.assertEqual(len(controller.command_latency), 1)
+
+    def test_out_of_stops(self):
+        dish = FakeDrive(ephem.Date('2026/07/11 00:00'), 0.0)
+        controller = tracking.TrackingController(dish, self.crab)
+        self.assertFalse(controller.step(dish.date))
+        self.assertTrue(controller.left_stops)
+        # Parking is left to the caller
+        self.assertFalse(dish.parked)
+
+    def test_run(self):
+        # A source on the meridian now, as the loop runs in real time
+        observatory = drive.Acre_Road.copy()
+        observatory.date = ephem.now()
+        dish = FakeDrive(observatory.date, 0.0)
+        controller = tracking.TrackingController(dish, observatory.sidereal_time(), rate=100.0)
+        self.assertEqual(controller.run(ticks=10), 10)
+        self.assertEqual(len(controller.jitter), 10)
+        self.assertFalse(dish.enabled)
+
+    def test_track_parks(self):
+        # A source on the opposite meridian is never inside the stops
+        observatory = drive.Acre_Road.copy()
+        observatory.date = ephem.now()
+        dish = FakeDrive(observatory.date, 0.0)
+        ra = ephem.hours(observatory.sidereal_time() + ephem.pi)
+        controller = drive.Track(dish, observatory, ra).track(duration=1, rate=100.0)
+        self.assertTrue(controller.left_stops)
+        self.assertTrue(dish.parked)
+
+
+if __name__ == '__main__':
+    unittest.main()